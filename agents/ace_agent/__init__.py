@@ -1,3 +1,6 @@
-from .agent import root_agent
+# AgentLoader imports this package as "ace_agent". Every module of the package
+# is imported through its absolute "agents.ace_agent" name, so the loaded
+# agent shares the recorder, profiler, caches and stores used by main.py.
+from agents.ace_agent.agent import root_agent
 
 __all__ = ["root_agent"]
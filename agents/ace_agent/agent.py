@@ -7,8 +7,16 @@ from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from google.genai.types import Part, UserContent
 
-from .schemas.playbook import Playbook
-from .sub_agents import curator, generator, reflector
+from agents.ace_agent.prompts import PLAYBOOK_KEY, PLAYBOOK_VERSION_KEY
+from agents.ace_agent.replay import record_cycle_end, record_cycle_start
+from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.services.sessions import scratch_key
+from agents.ace_agent.sub_agents import curator, generator, reflector
+from agents.ace_agent.sub_agents.generator import GENERATOR_SAMPLES_KEY
+from agents.ace_agent.tenants import TENANT_KEY, load_playbook, tenant_of
+from agents.ace_agent.tracing import span, start_cycle_profile, stop_cycle_profile
+
+USER_QUERY_KEY = scratch_key("user_query")
 
 
 class StateInitializer(BaseAgent):
@@ -18,13 +26,18 @@ class StateInitializer(BaseAgent):
         state = ctx.session.state
 
         state_changes = {}
-        state_changes["user_query"] = ctx.user_content
+        state_changes[USER_QUERY_KEY] = ctx.user_content
+        # Best-of-N samples belong to a single turn
+        state_changes[GENERATOR_SAMPLES_KEY] = None
 
         # Required state
-        # Initialize app:playbook
-        if "app:playbook" not in state:
-            pb = Playbook()
-            state_changes["app:playbook"] = pb.to_dict()
+        # Load the tenant's playbook (an empty one for new tenants)
+        tenant = tenant_of(state)
+        with span("TenantPlaybookStore.get", tenant=tenant):
+            playbook, version = load_playbook(tenant)
+        state_changes[TENANT_KEY] = tenant
+        state_changes[PLAYBOOK_KEY] = playbook
+        state_changes[PLAYBOOK_VERSION_KEY] = version
 
         # 🔹 ground_truth (optional)
         # If user doesn't provide, explicitly initialize with None
@@ -55,13 +68,14 @@ class CycleSummary(BaseAgent):
         generator_output = state.get("generator_output", {})
         reflector_output = state.get("reflector_output", {})
         curator_output = state.get("curator_output", {})
-        playbook = state.get("app:playbook", {})
+        playbook = state.get(PLAYBOOK_KEY, {})
         
         # Get final answer
         final_answer = generator_output.get("final_answer", "N/A") if generator_output else "N/A"
         
         # Get playbook stats
-        playbook_obj = Playbook.from_dict(playbook) if playbook else None
+        with span("Playbook.from_dict"):
+            playbook_obj = Playbook.from_dict(playbook) if playbook else None
         stats = playbook_obj.stats() if playbook_obj else {"sections": 0, "bullets": 0, "tags": {"helpful": 0, "harmful": 0, "neutral": 0}}
         
         # Get reflection insights
@@ -109,6 +123,8 @@ ace_iteration = SequentialAgent(
         curator,
         cycle_summary,
     ],
+    before_agent_callback=[record_cycle_start, start_cycle_profile],
+    after_agent_callback=[stop_cycle_profile, record_cycle_end],
     description="""ACE Agent: Agentic Context Engineering System
 
 A self-improving agent that learns through iterative cycles:
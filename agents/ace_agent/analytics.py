@@ -0,0 +1,338 @@
+"""Append-only columnar store of bullet citation and tag events.
+
+Every cycle appends one row per cited bullet and one per tag to fixed-width
+column files under ``Config.analytics_dir``::
+
+    ts.f64      event time (unix seconds)
+    cycle.u32   cycle sequence number
+    bullet.u32  bullet number, see bullets.txt
+    kind.u8     index into KINDS
+    bullets.txt JSON [tenant, bullet id] pairs, one per line, in first-seen order
+
+Bullet ids are only unique within a tenant's playbook, so every bullet is
+numbered per (tenant, bullet id) and all queries take the tenant.
+
+The co-citation matrix, last-used index and daily tag counters are updated
+as rows are appended and snapshotted to ``index.json``, so queries never
+scan the event history and a restart only replays rows after the snapshot.
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from config import Config
+
+config = Config()
+
+KINDS = ("cited", "helpful", "harmful", "neutral")
+TAGS = KINDS[1:]
+DAY = 86400.0
+
+# column name -> array typecode
+COLUMNS = {"ts": "d", "cycle": "I", "bullet": "I", "kind": "B"}
+
+# (tenant, bullet id)
+BulletKey = Tuple[str, str]
+
+
+class UsageStore:
+    """Bullet usage events on disk plus incrementally maintained indexes."""
+
+    def __init__(self, path: str, snapshot_every: int = 100):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._ids: List[BulletKey] = []
+        self._numbers: Dict[BulletKey, int] = {}
+        # tenant -> bullet numbers
+        self._tenant_bullets: Dict[str, Set[int]] = defaultdict(set)
+        self.rows = 0
+        self.cycles = 0
+        # Sparse symmetric co-citation counts: bullet -> {bullet: cycles}
+        self._co_cited: Dict[int, Counter] = defaultdict(Counter)
+        self._citations: Counter = Counter()
+        self._last_used: Dict[int, float] = {}
+        # bullet -> day number -> [helpful, harmful, neutral]
+        self._daily_tags: Dict[int, Dict[int, List[int]]] = defaultdict(dict)
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+    def record_cycle(
+        self,
+        tenant: str,
+        cited: Sequence[str],
+        tags: Iterable[Tuple[str, str]],
+        ts: Optional[float] = None,
+    ) -> None:
+        """Append the bullets of ``tenant`` cited and tagged in one cycle."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            cycle = self.cycles
+            new_ids: List[BulletKey] = []
+            rows: List[Tuple[float, int, int, int]] = []
+            for bullet_id in dict.fromkeys(cited):
+                rows.append((ts, cycle, self._number((tenant, bullet_id), new_ids), 0))
+            for bullet_id, tag in tags:
+                number = self._number((tenant, bullet_id), new_ids)
+                rows.append((ts, cycle, number, KINDS.index(tag)))
+
+            if new_ids:
+                with open(self._file("bullets.txt"), "a", encoding="utf-8") as fh:
+                    fh.writelines(json.dumps(list(key)) + "\n" for key in new_ids)
+            for position, (name, typecode) in enumerate(COLUMNS.items()):
+                with open(self._file(f"{name}.{self._suffix(typecode)}"), "ab") as fh:
+                    array(typecode, (row[position] for row in rows)).tofile(fh)
+
+            self._apply(rows)
+            self.cycles += 1
+            if self.cycles % self.snapshot_every == 0:
+                self._snapshot()
+
+    def flush(self) -> None:
+        """Write the index snapshot now."""
+        with self._lock:
+            self._snapshot()
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def unused(
+        self, tenant: str, bullet_ids: Iterable[str], since: Optional[float] = None
+    ) -> List[Dict[str, object]]:
+        """Bullets of ``bullet_ids`` never cited, or not cited since ``since``.
+
+        Never-cited bullets come first, then the longest unused.
+        """
+        result = []
+        with self._lock:
+            for bullet_id in bullet_ids:
+                number = self._numbers.get((tenant, bullet_id))
+                last_used = self._last_used.get(number) if number is not None else None
+                if last_used is None or (since is not None and last_used < since):
+                    result.append(
+                        {
+                            "bullet_id": bullet_id,
+                            "last_used": last_used,
+                            "citations": self._citations[number] if number is not None else 0,
+                        }
+                    )
+        result.sort(key=lambda item: (item["last_used"] is not None, item["last_used"] or 0.0))
+        return result
+
+    def neighbors(self, tenant: str, bullet_id: str, n: int = 5) -> List[Tuple[str, int]]:
+        """Bullets most often cited in the same cycle as ``bullet_id``."""
+        with self._lock:
+            number = self._numbers.get((tenant, bullet_id))
+            if number is None or number not in self._co_cited:
+                return []
+            # Cycles belong to one tenant, so co-cited bullets share it
+            return [
+                (self._ids[other][1], count)
+                for other, count in self._co_cited[number].most_common(n)
+            ]
+
+    def neighbor_table(self, tenant: str, n: int = 5) -> Dict[str, List[Tuple[str, int]]]:
+        """:meth:`neighbors` of every co-cited bullet of ``tenant``."""
+        with self._lock:
+            numbers = [b for b in self._tenant_bullets.get(tenant, ()) if b in self._co_cited]
+        return {self._ids[b][1]: self.neighbors(tenant, self._ids[b][1], n) for b in numbers}
+
+    def prefetch(self, tenant: str, bullet_ids: Iterable[str], n: int = 5) -> List[str]:
+        """Co-cited bullets to pull into a prompt next to ``bullet_ids``."""
+        seeds = dict.fromkeys(bullet_ids)
+        scores: Counter = Counter()
+        for bullet_id in seeds:
+            for other, count in self.neighbors(tenant, bullet_id, n):
+                if other not in seeds:
+                    scores[other] += count
+        # Ties broken by id, so the prompt doesn't depend on seed order
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [bullet_id for bullet_id, _ in ranked[:n]]
+
+    def last_used(self, tenant: str, bullet_id: str) -> Optional[float]:
+        with self._lock:
+            number = self._numbers.get((tenant, bullet_id))
+            return self._last_used.get(number) if number is not None else None
+
+    def tag_drift(
+        self,
+        tenant: str,
+        window_days: int = 7,
+        n: int = 10,
+        now: Optional[float] = None,
+    ) -> List[Dict[str, object]]:
+        """Bullets of ``tenant`` whose helpful share moved most between the last two windows.
+
+        Compares the ``window_days`` ending at ``now`` with the
+        ``window_days`` before them, from the daily tag counters.
+        """
+        today = int((time.time() if now is None else now) // DAY)
+        recent_days = range(today - window_days + 1, today + 1)
+        previous_days = range(today - 2 * window_days + 1, today - window_days + 1)
+
+        drift = []
+        with self._lock:
+            for number in self._tenant_bullets.get(tenant, ()):
+                daily = self._daily_tags.get(number)
+                if not daily:
+                    continue
+                recent = self._window(daily, recent_days)
+                previous = self._window(daily, previous_days)
+                if not sum(recent) or not sum(previous):
+                    continue
+                change = recent[0] / sum(recent) - previous[0] / sum(previous)
+                drift.append(
+                    {
+                        "bullet_id": self._ids[number][1],
+                        "recent": dict(zip(TAGS, recent)),
+                        "previous": dict(zip(TAGS, previous)),
+                        "helpful_share_change": round(change, 4),
+                    }
+                )
+        drift.sort(key=lambda item: abs(item["helpful_share_change"]), reverse=True)
+        return drift[:n]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "rows": self.rows,
+                "cycles": self.cycles,
+                "tenants": len(self._tenant_bullets),
+                "bullets": len(self._ids),
+                "co_cited_pairs": sum(len(c) for c in self._co_cited.values()) // 2,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Internal helpers
+    # ------------------------------------------------------------------ #
+    def _apply(self, rows: Sequence[Tuple[float, int, int, int]]) -> None:
+        """Fold rows of one cycle into the indexes."""
+        cited = []
+        for ts, _, number, kind in rows:
+            if kind == 0:
+                cited.append(number)
+                self._citations[number] += 1
+                self._last_used[number] = max(ts, self._last_used.get(number, ts))
+            else:
+                counters = self._daily_tags[number].setdefault(int(ts // DAY), [0, 0, 0])
+                counters[kind - 1] += 1
+        for a, b in combinations(cited, 2):
+            self._co_cited[a][b] += 1
+            self._co_cited[b][a] += 1
+        self.rows += len(rows)
+
+    @staticmethod
+    def _window(daily: Dict[int, List[int]], days: range) -> List[int]:
+        totals = [0, 0, 0]
+        for day in days:
+            counters = daily.get(day)
+            if counters:
+                for i, count in enumerate(counters):
+                    totals[i] += count
+        return totals
+
+    def _number(self, key: BulletKey, new_ids: List[BulletKey]) -> int:
+        number = self._numbers.get(key)
+        if number is None:
+            number = len(self._ids)
+            self._ids.append(key)
+            self._numbers[key] = number
+            self._tenant_bullets[key[0]].add(number)
+            new_ids.append(key)
+        return number
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @staticmethod
+    def _suffix(typecode: str) -> str:
+        return {"d": "f64", "I": "u32", "B": "u8"}[typecode]
+
+    def _snapshot(self) -> None:
+        payload = {
+            "rows": self.rows,
+            "cycles": self.cycles,
+            "bullets": len(self._ids),
+            "co_cited": {str(a): dict(c) for a, c in self._co_cited.items()},
+            "citations": dict(self._citations),
+            "last_used": self._last_used,
+            "daily_tags": {str(b): d for b, d in self._daily_tags.items()},
+        }
+        tmp = self._file("index.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, separators=(",", ":"))
+        os.replace(tmp, self._file("index.json"))
+
+    def _load(self) -> None:
+        if os.path.exists(self._file("bullets.txt")):
+            with open(self._file("bullets.txt"), encoding="utf-8") as fh:
+                self._ids = [tuple(json.loads(line)) for line in fh if line.strip()]
+            self._numbers = {key: i for i, key in enumerate(self._ids)}
+            for number, (tenant, _) in enumerate(self._ids):
+                self._tenant_bullets[tenant].add(number)
+
+        if os.path.exists(self._file("index.json")):
+            with open(self._file("index.json"), encoding="utf-8") as fh:
+                snapshot = json.load(fh)
+            self.rows = snapshot["rows"]
+            self.cycles = snapshot["cycles"]
+            for a, counts in snapshot["co_cited"].items():
+                self._co_cited[int(a)] = Counter({int(b): c for b, c in counts.items()})
+            self._citations = Counter({int(b): c for b, c in snapshot["citations"].items()})
+            self._last_used = {int(b): ts for b, ts in snapshot["last_used"].items()}
+            for b, daily in snapshot["daily_tags"].items():
+                self._daily_tags[int(b)] = {int(day): c for day, c in daily.items()}
+
+        # Replay rows appended after the snapshot, by cycle
+        tail = self._read_tail(self.rows)
+        cycle_rows: List[Tuple[float, int, int, int]] = []
+        for row in zip(*tail):
+            if cycle_rows and row[1] != cycle_rows[-1][1]:
+                self._apply(cycle_rows)
+                cycle_rows = []
+            cycle_rows.append(row)
+        if cycle_rows:
+            self._apply(cycle_rows)
+        if tail[1]:
+            self.cycles = tail[1][-1] + 1
+
+    def _read_tail(self, start: int) -> List[array]:
+        columns = []
+        for name, typecode in COLUMNS.items():
+            column = array(typecode)
+            path = self._file(f"{name}.{self._suffix(typecode)}")
+            if os.path.exists(path):
+                with open(path, "rb") as fh:
+                    fh.seek(start * column.itemsize)
+                    data = fh.read()
+                # Drop a partially written trailing value
+                column.frombytes(data[: len(data) - len(data) % column.itemsize])
+            columns.append(column)
+        # Columns are appended one after another; cut a torn row off all of them
+        length = min(len(column) for column in columns)
+        for (name, typecode), column in zip(COLUMNS.items(), columns):
+            path = self._file(f"{name}.{self._suffix(typecode)}")
+            if os.path.exists(path):
+                with open(path, "r+b") as fh:
+                    fh.truncate((start + length) * column.itemsize)
+        return [column[:length] for column in columns]
+
+
+usage_store: Optional[UsageStore] = UsageStore(config.analytics_dir) if config.analytics_dir else None
+
+
+def record_usage(
+    tenant: str, cited: Sequence[str], tags: Iterable[Tuple[str, str]]
+) -> None:
+    """Record one cycle's citations and tags if analytics are enabled."""
+    if usage_store is not None:
+        usage_store.record_cycle(tenant, cited, tags)
@@ -0,0 +1,528 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import LlmRequest
+from google.adk.models.registry import LLMRegistry
+from google.adk.utils.instructions_utils import inject_session_state
+from google.genai.types import Content, Part
+
+from agents.ace_agent import analytics
+from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.services.sessions import scratch_key
+from agents.ace_agent.tenants import load_playbook, save_playbook, tenant_of
+from agents.ace_agent.tracing import span
+from config import Config
+
+config = Config()
+
+# Session state keys holding the tenant's playbook for the current cycle and
+# its Playbook.fingerprint(). StateInitializer loads both from the tenant
+# store; every agent that changes the playbook starts from
+# stored_playbook and writes both through playbook_state_delta, which also
+# saves it back to the store.
+PLAYBOOK_KEY = scratch_key("playbook")
+PLAYBOOK_VERSION_KEY = scratch_key("playbook_version")
+
+
+DIGEST_INSTRUCTION = """Summarize the following playbook section in one sentence of at most 30 words.
+Name the kinds of problems it helps with; do not list bullet IDs.
+
+"""
+
+RELATED_HEADER = "## related (often cited together)"
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> Set[str]:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2}
+
+
+def _block_chars(playbook: Playbook, bullet_ids: List[str]) -> int:
+    """Characters the related-bullets block takes in the prompt, separator included."""
+    if not bullet_ids:
+        return 0
+    lines = [RELATED_HEADER] + [playbook.render_bullet(bullet_id) for bullet_id in bullet_ids]
+    return sum(len(line) + 1 for line in lines)
+
+
+# ============================================
+# Section digests
+# ============================================
+class SectionDigests:
+    """Per-section digests keyed on :meth:`Playbook.section_fingerprint`.
+
+    A digest is computed locally on first use and reused until the section's
+    bullets change. With ``model`` set, an LLM summary is also requested in
+    the background and replaces the local digest once it arrives; prefixes
+    already rendered keep the local digest until the next playbook version.
+    Summaries are keyed on bullet contents only, so tagging a bullet
+    re-renders the counters around the cached summary instead of paying for
+    a new one.
+    """
+
+    def __init__(self, model: Optional[str] = None, max_entries: int = 4096):
+        self.model = model
+        self.max_entries = max_entries
+        # fingerprint -> (digest, words of section name and bullets)
+        self._entries: "OrderedDict[str, Tuple[str, FrozenSet[str]]]" = OrderedDict()
+        # content-only fingerprint -> LLM summary text
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Set[str] = set()
+        # The loop keeps only weak references to tasks; hold them until done
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.llm_jobs = 0
+        self.llm_failures = 0
+
+    def get(self, playbook: Playbook, section: str) -> Tuple[str, FrozenSet[str]]:
+        """Return ``(digest, words)`` for ``section`` of ``playbook``."""
+        fingerprint = playbook.section_fingerprint(section)
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return entry
+
+        words = _words(section)
+        for bullet_id in playbook.sections.get(section, []):
+            words |= _words(playbook.bullets[bullet_id].content)
+        content = playbook.section_fingerprint(section, counters=False)
+        with self._lock:
+            summary = self._summaries.get(content)
+            if summary is not None:
+                self._summaries.move_to_end(content)
+        entry = (playbook.section_digest(section, summary=summary), frozenset(words))
+        with self._lock:
+            self.misses += 1
+            self._store(self._entries, fingerprint, entry)
+        if self.model and summary is None:
+            self._schedule_summary(fingerprint, content, playbook, section, entry[1])
+        return entry
+
+    def _store(self, cache: OrderedDict, key: str, value) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def _schedule_summary(
+        self,
+        fingerprint: str,
+        content: str,
+        playbook: Playbook,
+        section: str,
+        words: FrozenSet[str],
+    ) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        with self._lock:
+            if content in self._pending:
+                return
+            self._pending.add(content)
+            self.llm_jobs += 1
+        task = loop.create_task(
+            self._summarize(fingerprint, content, playbook, section, words)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(
+        self,
+        fingerprint: str,
+        content: str,
+        playbook: Playbook,
+        section: str,
+        words: FrozenSet[str],
+    ) -> None:
+        # ``playbook`` is a prefix handle's parsed copy and is never mutated
+        rendering = playbook.render_section(section)
+        try:
+            llm = LLMRegistry.new_llm(self.model)
+            request = LlmRequest(
+                model=self.model,
+                contents=[
+                    Content(role="user", parts=[Part(text=DIGEST_INSTRUCTION + rendering)])
+                ],
+            )
+            text = ""
+            async for response in llm.generate_content_async(request):
+                if response.content and response.content.parts and not response.partial:
+                    text += "".join(part.text or "" for part in response.content.parts)
+            if not text.strip():
+                raise ValueError("empty summary")
+            digest = playbook.section_digest(section, summary=text.strip())
+            with self._lock:
+                self._store(self._summaries, content, text.strip())
+                self._store(self._entries, fingerprint, (digest, words))
+        except Exception:
+            with self._lock:
+                self.llm_failures += 1
+        finally:
+            with self._lock:
+                self._pending.discard(content)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "summaries": len(self._summaries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "llm_jobs": self.llm_jobs,
+                "llm_failures": self.llm_failures,
+                "llm_pending": len(self._pending),
+            }
+
+
+# ============================================
+# Prefix cache
+# ============================================
+class CachedPrefix:
+    """Rendered static instruction + playbook for one agent and playbook version.
+
+    ``collapsed`` prefixes carry section digests instead of bullets; the
+    parsed ``playbook`` is kept so the per-query part can expand sections
+    without parsing state again.
+    """
+
+    def __init__(
+        self,
+        agent_name: str,
+        version: str,
+        text: str,
+        playbook: Optional[Playbook] = None,
+        collapsed: bool = False,
+        digests_chars: int = 0,
+    ):
+        self.agent_name = agent_name
+        self.version = version
+        self.text = text
+        self.playbook = playbook
+        self.collapsed = collapsed
+        self.digests_chars = digests_chars
+        # (section, words, summed score key, full rendering) per section,
+        # built on first expand
+        self.sections: Optional[List[Tuple[str, FrozenSet[str], float, str]]] = None
+        self.name = f"{agent_name}@{version[:12]}"
+        self.created_at = time.time()
+        self.hits = 0
+
+
+class PromptCache:
+    """Prefix handles keyed on (agent, playbook version).
+
+    The prefix is rendered once per playbook version, so it is byte-identical
+    across queries until the playbook changes. Handles are local renderings:
+    they only target the provider's implicit prefix caching, and no explicit
+    cached-content resource is created for them. ADK's ``ContextCacheConfig``
+    is not used because it fingerprints the whole system instruction, which
+    here ends with the per-query fields. Writers of the playbook call
+    :meth:`invalidate` with the version they replaced. At most
+    ``max_handles`` handles are kept; with one current version per tenant,
+    the least recently used beyond that are dropped.
+    """
+
+    def __init__(self, digests: Optional[SectionDigests] = None, max_handles: int = 256):
+        self._handles: "OrderedDict[tuple, CachedPrefix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.digests = digests or SectionDigests()
+        self.max_handles = max_handles
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.prefix_chars = 0
+        self.prompt_chars = 0
+        self.collapsed_prompts = 0
+        self.expanded_sections = 0
+        self.partial_sections = 0
+        self.related_bullets = 0
+
+    def prefix(
+        self, agent_name: str, static: str, state, budget_chars: int = 0
+    ) -> CachedPrefix:
+        """Return the prefix handle for ``agent_name`` and the current playbook.
+
+        With ``budget_chars`` set and a playbook rendering longer than that,
+        the prefix lists one digest per section instead of every bullet.
+        """
+        playbook_data = state.get(PLAYBOOK_KEY) or {}
+        version = state.get(PLAYBOOK_VERSION_KEY)
+        playbook: Optional[Playbook] = None
+        if version is None:
+            playbook = Playbook.from_dict(playbook_data)
+            version = playbook.fingerprint()
+
+        key = (agent_name, version)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                self._handles.move_to_end(key)
+                handle.hits += 1
+                self.hits += 1
+                return handle
+
+        playbook = playbook or Playbook.from_dict(playbook_data)
+        rendering = playbook.as_prompt() or "(empty playbook)"
+        if not budget_chars or len(rendering) <= budget_chars:
+            text = (
+                f"{static.strip()}\n\n"
+                f"Current Playbook (version {version[:12]}):\n{rendering}\n\n"
+            )
+            handle = CachedPrefix(agent_name, version, text, playbook)
+        else:
+            digests = "\n".join(
+                self.digests.get(playbook, section)[0] for section in sorted(playbook.sections)
+            )
+            text = (
+                f"{static.strip()}\n\n"
+                f"Current Playbook (version {version[:12]}), one digest per section; "
+                f"the sections most relevant to the query are listed in full after it:\n"
+                f"{digests}\n\n"
+            )
+            handle = CachedPrefix(
+                agent_name, version, text, playbook, collapsed=True, digests_chars=len(digests)
+            )
+        with self._lock:
+            self._handles[key] = handle
+            self._handles.move_to_end(key)
+            self.misses += 1
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+                self.evictions += 1
+        return handle
+
+    def invalidate(self, version: Optional[str]) -> None:
+        """Drop every prefix handle rendered for ``version``."""
+        if version is None:
+            return
+        with self._lock:
+            stale = [key for key in self._handles if key[1] == version]
+            for key in stale:
+                del self._handles[key]
+            self.invalidations += len(stale)
+
+    def expand(
+        self,
+        handle: CachedPrefix,
+        query: str,
+        budget_chars: int,
+        related: Optional[Callable[[Iterable[str]], List[str]]] = None,
+    ) -> List[str]:
+        """Pick sections of a collapsed prefix to render in full for ``query``.
+
+        Sections are ranked by words shared with the query, then by summed
+        decayed score, and added while the digests plus expansions stay within
+        ``budget_chars``. A section sharing words with the query that doesn't
+        fit is shown with its highest-scoring bullets only; after that, no
+        section sharing no words with the query is expanded.
+
+        ``related`` maps bullet ids to bullets often cited with them. Seeded
+        with the query's sections, those from other sections are listed after
+        the expansions; their room is taken before partial or unrelated
+        sections are added.
+        """
+        if handle.sections is None:
+            playbook = handle.playbook
+            handle.sections = [
+                (
+                    section,
+                    self.digests.get(playbook, section)[1],
+                    sum(playbook.bullets[bid].score_key for bid in bullet_ids),
+                    playbook.render_section(section),
+                )
+                for section, bullet_ids in sorted(playbook.sections.items())
+            ]
+        query_words = _words(query)
+        ranked = sorted(
+            handle.sections,
+            key=lambda entry: (-len(query_words & entry[1]), -entry[2]),
+        )
+
+        remaining = budget_chars - handle.digests_chars
+        expanded: List[str] = []
+        shown: List[str] = []
+        partial = 0
+        related_ids: Optional[List[str]] = None if related is not None else []
+        for section, words, _, rendering in ranked:
+            relevant = bool(query_words & words)
+            if related_ids is None and not (relevant and len(rendering) + 1 <= remaining):
+                # The query's sections that fit are placed; co-cited bullets
+                # get room before partial or unrelated sections
+                seeds = shown + ([section] if relevant else [])
+                related_ids = self._related(handle.playbook, related, seeds, remaining)
+                remaining -= _block_chars(handle.playbook, related_ids)
+            if partial and not relevant:
+                break
+            if len(rendering) + 1 > remaining:
+                if not relevant:
+                    continue
+                rendering = handle.playbook.render_section(section, max_chars=remaining - 1)
+                if not rendering:
+                    continue
+                partial += 1
+            expanded.append(rendering)
+            shown.append(section)
+            remaining -= len(rendering) + 1
+        if related_ids is None:
+            related_ids = self._related(handle.playbook, related, shown, remaining)
+
+        # Drop bullets of sections that were expanded after room was reserved
+        related_ids = [
+            bullet_id
+            for bullet_id in related_ids
+            if handle.playbook.bullets[bullet_id].section not in shown
+        ]
+        if related_ids:
+            expanded.append(
+                "\n".join(
+                    [RELATED_HEADER]
+                    + [handle.playbook.render_bullet(bullet_id) for bullet_id in related_ids]
+                )
+            )
+        with self._lock:
+            self.collapsed_prompts += 1
+            self.expanded_sections += len(shown)
+            self.partial_sections += partial
+            self.related_bullets += len(related_ids)
+        return expanded
+
+    @staticmethod
+    def _related(
+        playbook: Playbook,
+        related: Callable[[Iterable[str]], List[str]],
+        sections: List[str],
+        room: int,
+    ) -> List[str]:
+        """Bullets often cited with those of ``sections`` that fit in ``room`` chars."""
+        seeds = [bullet_id for section in sections for bullet_id in playbook.sections[section]]
+        if not seeds:
+            return []
+        seeded = set(seeds)
+        picked: List[str] = []
+        for bullet_id in related(seeds):
+            if bullet_id in seeded or bullet_id not in playbook.bullets:
+                continue
+            if _block_chars(playbook, picked + [bullet_id]) > room:
+                break
+            picked.append(bullet_id)
+        return picked
+
+    def record(self, prefix_chars: int, total_chars: int) -> None:
+        with self._lock:
+            self.prefix_chars += prefix_chars
+            self.prompt_chars += total_chars
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "handles": sorted(h.name for h in self._handles.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "cacheable_prefix_ratio": (
+                    round(self.prefix_chars / self.prompt_chars, 4)
+                    if self.prompt_chars
+                    else 0.0
+                ),
+                "collapsed_prompts": self.collapsed_prompts,
+                "mean_expanded_sections": (
+                    round(self.expanded_sections / self.collapsed_prompts, 2)
+                    if self.collapsed_prompts
+                    else 0.0
+                ),
+                "partial_sections": self.partial_sections,
+                "related_bullets": self.related_bullets,
+                "digests": self.digests.stats(),
+            }
+
+
+prompt_cache = PromptCache(
+    SectionDigests(model=config.digest_model), max_handles=config.prompt_cache_max_handles
+)
+
+
+def stored_playbook(state) -> Tuple[Playbook, str]:
+    """The session tenant's current playbook and version from the tenant store.
+
+    Concurrent cycles of one tenant may have saved newer versions since this
+    cycle's snapshot in ``PLAYBOOK_KEY`` was taken, so changes are applied to
+    the stored playbook. Callers must not await between this and
+    :func:`playbook_state_delta`, which keeps the read-modify-write atomic on
+    the event loop.
+    """
+    tenant = tenant_of(state)
+    with span("TenantPlaybookStore.get", tenant=tenant):
+        data, version = load_playbook(tenant)
+    with span("Playbook.from_dict", bullets=len(data.get("bullets", {}))):
+        playbook = Playbook.from_dict(data)
+    return playbook, version
+
+
+def playbook_state_delta(
+    playbook: Playbook, state, previous: Optional[str] = None
+) -> Dict[str, object]:
+    """State delta for a changed playbook.
+
+    Saves the playbook for the session's tenant and invalidates the prefix
+    handles of the replaced version, ``previous`` or else the session's.
+    """
+    with span("Playbook.fingerprint", bullets=len(playbook.bullets)):
+        version = playbook.fingerprint()
+    if previous is None:
+        previous = state.get(PLAYBOOK_VERSION_KEY)
+    if previous != version:
+        prompt_cache.invalidate(previous)
+    with span("Playbook.to_dict", bullets=len(playbook.bullets)):
+        data = playbook.to_dict()
+    tenant = tenant_of(state)
+    with span("TenantPlaybookStore.put", tenant=tenant):
+        save_playbook(tenant, data, version)
+    return {PLAYBOOK_KEY: data, PLAYBOOK_VERSION_KEY: version}
+
+
+def prefix_first_instruction(static: str, per_query: str, budget_chars: int = 0):
+    """Build an instruction provider laid out as static + playbook, then query.
+
+    ``per_query`` may use ``{state_key}`` placeholders like a plain ADK
+    instruction string. With ``budget_chars`` set, playbooks rendering longer
+    than that are collapsed to section digests in the prefix, and the
+    sections most relevant to the query are expanded in the per-query part.
+    """
+
+    async def provider(ctx: ReadonlyContext) -> str:
+        handle = prompt_cache.prefix(ctx.agent_name, static, ctx.state, budget_chars)
+        suffix = await inject_session_state(per_query, ctx)
+        if handle.collapsed:
+            content = ctx.user_content
+            query = (
+                "".join(part.text or "" for part in content.parts)
+                if content and content.parts
+                else ""
+            )
+            store = analytics.usage_store
+            related = None
+            if store is not None:
+                related = partial(
+                    store.prefetch, tenant_of(ctx.state), n=config.prefetch_related_bullets
+                )
+            expanded = prompt_cache.expand(handle, query, budget_chars, related)
+            if expanded:
+                suffix = "Expanded Playbook Sections:\n" + "\n".join(expanded) + "\n\n" + suffix
+        prompt_cache.record(len(handle.text), len(handle.text) + len(suffix))
+        return handle.text + suffix
+
+    return provider
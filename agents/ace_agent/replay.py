@@ -0,0 +1,383 @@
+"""Record model calls to a trace file and replay them offline.
+
+    python -m agents.ace_agent.replay trace.jsonl --latency-scale 0.1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event, EventActions
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai.types import Part, UserContent
+
+from agents.ace_agent import analytics, tenants, tracing
+from agents.ace_agent.prompts import PLAYBOOK_KEY
+from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.tenants import TENANT_KEY
+from config import Config
+
+config = Config()
+
+
+def request_hash(llm_request: LlmRequest) -> str:
+    """Stable hash of the prompt sent to the model."""
+    payload = {
+        "system_instruction": str(llm_request.config.system_instruction or ""),
+        "contents": [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _content_text(content) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts)
+
+
+# ============================================
+# Recording
+# ============================================
+class TraceRecorder:
+    """Append cycle markers and model calls to a JSON-lines trace file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._model_started: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._cycle_started: Dict[str, Tuple[float, float]] = {}
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str, separators=(",", ":"))
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+    def cycle_start(self, callback_context: CallbackContext) -> None:
+        invocation_id = callback_context.invocation_id
+        self._drop_stale()
+        self._cycle_started[invocation_id] = (time.perf_counter(), time.process_time())
+        session = callback_context.session
+        tenant = tenants.tenant_of(callback_context.state)
+        record = {
+            "type": "cycle_start",
+            "invocation_id": invocation_id,
+            "user_id": session.user_id,
+            "session_id": session.id,
+            "tenant_id": tenant,
+            "user_query": _content_text(callback_context.user_content),
+            "ground_truth": callback_context.state.get("ground_truth"),
+            "playbook": tenants.load_playbook(tenant)[0],
+        }
+        if analytics.usage_store is not None:
+            # Co-cited bullets shown in the Generator prompt come from here
+            record["co_cited"] = analytics.usage_store.neighbor_table(
+                tenant, config.prefetch_related_bullets
+            )
+        self.write(record)
+
+    def cycle_end(self, callback_context: CallbackContext) -> None:
+        invocation_id = callback_context.invocation_id
+        started = self._cycle_started.pop(invocation_id, None)
+        # Requests of cancelled best-of-N samples never get a response
+        for key in [key for key in self._model_started if key[0] == invocation_id]:
+            del self._model_started[key]
+        if started is None:
+            return
+        self.write(
+            {
+                "type": "cycle_end",
+                "invocation_id": invocation_id,
+                "latency_s": time.perf_counter() - started[0],
+                "cpu_s": time.process_time() - started[1],
+                "playbook": callback_context.state.get(PLAYBOOK_KEY),
+            }
+        )
+
+    def _drop_stale(self) -> None:
+        """Forget cycles and requests of failed cycles, which never end."""
+        cutoff = time.perf_counter() - config.cycle_timeout_seconds
+        for pending in (self._cycle_started, self._model_started):
+            for key in [key for key, value in pending.items() if value[0] < cutoff]:
+                del pending[key]
+
+    def model_request(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._model_started[key] = (time.perf_counter(), request_hash(llm_request))
+
+    def model_response(self, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        started, hashed = self._model_started.pop(key, (None, None))
+        self.write(
+            {
+                "type": "llm",
+                "invocation_id": callback_context.invocation_id,
+                "agent": callback_context.agent_name,
+                "request_hash": hashed,
+                "latency_s": time.perf_counter() - started if started else 0.0,
+                "response": llm_response.model_dump(mode="json", exclude_none=True),
+            }
+        )
+
+
+recorder: Optional[TraceRecorder] = TraceRecorder(config.record_file) if config.record_file else None
+
+
+def record_cycle_start(callback_context: CallbackContext) -> None:
+    """``before_agent_callback`` for the root agent."""
+    if recorder is not None:
+        recorder.cycle_start(callback_context)
+
+
+def record_cycle_end(callback_context: CallbackContext) -> None:
+    """``after_agent_callback`` for the root agent."""
+    if recorder is not None:
+        recorder.cycle_end(callback_context)
+
+
+def record_model_request(callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+    """``before_model_callback`` for the LLM sub-agents."""
+    if recorder is not None:
+        recorder.model_request(callback_context, llm_request)
+
+
+def record_model_response(callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+    """``after_model_callback`` for the LLM sub-agents."""
+    if recorder is not None:
+        recorder.model_response(callback_context, llm_response)
+
+
+# ============================================
+# Replay
+# ============================================
+class ReplayTrace:
+    """Recorded cycles and their per-agent model responses."""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.cycles: List[Dict[str, Any]] = []
+        self._responses: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        by_invocation: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            kind = record.get("type")
+            if kind == "cycle_start":
+                cycle = dict(record)
+                by_invocation[record["invocation_id"]] = cycle
+                self.cycles.append(cycle)
+            elif kind == "cycle_end" and record["invocation_id"] in by_invocation:
+                cycle = by_invocation[record["invocation_id"]]
+                cycle["recorded_latency_s"] = record["latency_s"]
+                cycle["recorded_cpu_s"] = record["cpu_s"]
+                cycle["final_playbook"] = record["playbook"]
+            elif kind == "llm":
+                self._responses[record["invocation_id"]][record["agent"]].append(record)
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.request_mismatches = 0
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayTrace":
+        with open(path, encoding="utf-8") as fh:
+            return cls([json.loads(line) for line in fh if line.strip()])
+
+    def begin_cycle(self, cycle: Dict[str, Any]) -> None:
+        self._pending = {
+            agent: deque(records)
+            for agent, records in self._responses[cycle["invocation_id"]].items()
+        }
+
+    def next_response(self, agent_name: str, llm_request: LlmRequest) -> Dict[str, Any]:
+        queue = self._pending.get(agent_name)
+        if not queue:
+            raise RuntimeError(f"No recorded response left for agent {agent_name!r}")
+        record = queue.popleft()
+        if record.get("request_hash") and record["request_hash"] != request_hash(llm_request):
+            self.request_mismatches += 1
+        return record
+
+
+class RecordedNeighbors:
+    """Usage store stand-in answering from a cycle's recorded co-citations."""
+
+    def __init__(self, table: Dict[str, List[List[Any]]]):
+        self.table = table
+
+    def neighbors(self, tenant: str, bullet_id: str, n: int = 5) -> List[Tuple[str, int]]:
+        return [(other, count) for other, count in self.table.get(bullet_id, [])[:n]]
+
+    prefetch = analytics.UsageStore.prefetch
+
+    def record_cycle(self, *args: Any, **kwargs: Any) -> None:
+        """Replayed cycles are not recorded."""
+
+
+class ReplayLlm(BaseLlm):
+    """Model stand-in that answers from a :class:`ReplayTrace`."""
+
+    model: str = "replay"
+    agent_name: str
+    trace: Any
+    latency_scale: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        record = self.trace.next_response(self.agent_name, llm_request)
+        delay = record.get("latency_s", 0.0) * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield LlmResponse.model_validate(record["response"])
+
+
+def install_replay(
+    root: BaseAgent, trace: ReplayTrace, latency_scale: float = 0.0
+) -> Dict[str, Any]:
+    """Point every LLM agent under ``root`` at ``trace``; return original models."""
+    originals: Dict[str, Any] = {}
+
+    def walk(agent: BaseAgent) -> None:
+        if isinstance(agent, LlmAgent):
+            originals[agent.name] = agent.model
+            agent.model = ReplayLlm(
+                agent_name=agent.name, trace=trace, latency_scale=latency_scale
+            )
+        for sub_agent in agent.sub_agents:
+            walk(sub_agent)
+
+    walk(root)
+    return originals
+
+
+def restore_models(root: BaseAgent, originals: Dict[str, Any]) -> None:
+    if isinstance(root, LlmAgent) and root.name in originals:
+        root.model = originals[root.name]
+    for sub_agent in root.sub_agents:
+        restore_models(sub_agent, originals)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"total": 0.0, "mean": 0.0, "p50": 0.0, "max": 0.0}
+    return {
+        "total": round(sum(values), 6),
+        "mean": round(statistics.fmean(values), 6),
+        "p50": round(statistics.median(values), 6),
+        "max": round(max(values), 6),
+    }
+
+
+async def run_replay(trace_path: str, latency_scale: float = 0.0) -> Dict[str, Any]:
+    """Replay a recorded trace through ``root_agent`` and report performance."""
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from agents.ace_agent.agent import root_agent
+
+    global recorder
+
+    trace = ReplayTrace.load(trace_path)
+    # Replay against an in-memory tenant store seeded from the trace, without
+    # recording, profiling or usage analytics; co-citations are read from the
+    # trace
+    live = (recorder, tracing.profiler, analytics.usage_store, tenants.tenant_store)
+    recorder = tracing.profiler = analytics.usage_store = None
+    tenants.tenant_store = tenants.TenantPlaybookStore(None, 0)
+    seeded_tenants = set()
+    session_service = InMemorySessionService()
+    runner = Runner(app_name="ace_agent", agent=root_agent, session_service=session_service)
+    sessions: Dict[Tuple[str, str], Any] = {}
+    latencies: List[float] = []
+    cpu_times: List[float] = []
+    final_playbook: Optional[Dict[str, Any]] = None
+
+    originals = install_replay(root_agent, trace, latency_scale)
+    try:
+        for cycle in trace.cycles:
+            key = (cycle["user_id"], cycle["session_id"])
+            session = sessions.get(key)
+            if session is None:
+                session = await session_service.create_session(
+                    app_name="ace_agent", user_id=cycle["user_id"]
+                )
+                sessions[key] = session
+            tenant = cycle.get("tenant_id") or config.default_tenant
+            if tenant not in seeded_tenants and cycle.get("playbook"):
+                playbook = Playbook.from_dict(cycle["playbook"])
+                tenants.save_playbook(tenant, playbook.to_dict(), playbook.fingerprint())
+            seeded_tenants.add(tenant)
+            state_delta = {"ground_truth": cycle.get("ground_truth"), TENANT_KEY: tenant}
+            await session_service.append_event(
+                session, Event(author="user", actions=EventActions(state_delta=state_delta))
+            )
+
+            co_cited = cycle.get("co_cited")
+            analytics.usage_store = RecordedNeighbors(co_cited) if co_cited is not None else None
+            trace.begin_cycle(cycle)
+            started, cpu_started = time.perf_counter(), time.process_time()
+            async for _ in runner.run_async(
+                user_id=session.user_id,
+                session_id=session.id,
+                new_message=UserContent(parts=[Part(text=cycle["user_query"])]),
+            ):
+                pass
+            latencies.append(time.perf_counter() - started)
+            cpu_times.append(time.process_time() - cpu_started)
+
+            session = await session_service.get_session(
+                app_name="ace_agent", user_id=session.user_id, session_id=session.id
+            )
+            sessions[key] = session
+            final_playbook = tenants.load_playbook(tenant)[0]
+    finally:
+        restore_models(root_agent, originals)
+        recorder, tracing.profiler, analytics.usage_store, tenants.tenant_store = live
+
+    recorded_playbook = trace.cycles[-1].get("final_playbook") if trace.cycles else None
+    replayed_fp = Playbook.from_dict(final_playbook).fingerprint() if final_playbook else None
+    recorded_fp = Playbook.from_dict(recorded_playbook).fingerprint() if recorded_playbook else None
+    return {
+        "cycles": len(trace.cycles),
+        "latency_scale": latency_scale,
+        "latency_s": _summary(latencies),
+        "cpu_s": _summary(cpu_times),
+        "recorded": {
+            "latency_s": _summary([c["recorded_latency_s"] for c in trace.cycles if "recorded_latency_s" in c]),
+            "cpu_s": _summary([c["recorded_cpu_s"] for c in trace.cycles if "recorded_cpu_s" in c]),
+        },
+        "request_mismatches": trace.request_mismatches,
+        "playbook_fingerprint": replayed_fp,
+        "recorded_playbook_fingerprint": recorded_fp,
+        "playbook_equal": replayed_fp == recorded_fp,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded ACE trace.")
+    parser.add_argument("trace", help="JSON-lines trace written with Config.record_file")
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=0.0,
+        help="Multiplier for recorded model latencies (1 = original, 0 = none)",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_replay(args.trace, latency_scale=args.latency_scale))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from .delta import DeltaBatch
-from .playbook import Playbook
+from agents.ace_agent.schemas.delta import DeltaBatch
+from agents.ace_agent.schemas.playbook import Playbook
 
 __all__ = ["Playbook", "DeltaBatch"]
@@ -1,9 +1,29 @@
+import hashlib
+import json
+import math
+import time
+from bisect import bisect_left, insort
 from datetime import datetime, timezone
-from typing import Dict, List, Literal, Optional
+from typing import Dict, List, Literal, Optional, Tuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-from .delta import DeltaBatch, DeltaOperation
+from agents.ace_agent.schemas.delta import DeltaBatch, DeltaOperation
+
+# Decayed scores halve every SCORE_HALF_LIFE_DAYS. Scores are stored in
+# "forward decay" form relative to SCORE_EPOCH: a tag applied at time t adds
+# weight * exp(lambda * (t - epoch)), so a bullet's stored key never needs
+# re-decaying and every bullet's key shares the same decay factor at read time.
+# Ordering by key is therefore ordering by current decayed score.
+SCORE_HALF_LIFE_DAYS = 30.0
+SCORE_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+SCORE_WEIGHTS = {"helpful": 1.0, "harmful": -1.0, "neutral": 0.0}
+_DECAY_RATE = math.log(2) / (SCORE_HALF_LIFE_DAYS * 86400.0)
+
+
+def _decay_factor(now: Optional[float] = None) -> float:
+    now = time.time() if now is None else now
+    return math.exp(_DECAY_RATE * (now - SCORE_EPOCH))
 
 
 class Bullet(BaseModel):
@@ -21,14 +41,21 @@ class Bullet(BaseModel):
     updated_at: str = Field(
         default_factory=lambda: datetime.now(timezone.utc).isoformat()
     )
+    # Forward-decayed (helpful - harmful) tag weight, see SCORE_HALF_LIFE_DAYS
+    score_key: float = 0.0
 
     def tag(
         self, tag: Literal["helpful", "harmful", "neutral"], increment: int = 1
     ) -> None:
         current = getattr(self, tag)
         setattr(self, tag, current + int(increment))
+        self.score_key += SCORE_WEIGHTS[tag] * int(increment) * _decay_factor()
         self.updated_at = datetime.now(timezone.utc).isoformat()
 
+    def score(self, now: Optional[float] = None) -> float:
+        """Exponentially decayed helpful-minus-harmful score at ``now``."""
+        return self.score_key / _decay_factor(now)
+
 
 class Playbook(BaseModel):
     """Structured context store as defined by ACE."""
@@ -37,6 +64,10 @@ class Playbook(BaseModel):
     sections: Dict[str, List[str]] = Field(default_factory=dict)
     next_id: int = 0
 
+    # Ascending (score_key, bullet_id) pairs; built lazily on first ranking
+    # query and then kept in sync by the CRUD helpers.
+    _score_index: Optional[List[Tuple[float, str]]] = PrivateAttr(default=None)
+
     # ------------------------------------------------------------------ #
     # CRUD utils
     # ------------------------------------------------------------------ #
@@ -47,9 +78,12 @@ class Playbook(BaseModel):
         bullet_id: Optional[str] = None,
     ) -> Bullet:
         bullet_id = bullet_id or self._generate_id(section)
+        if bullet_id in self.bullets:
+            self._index_remove(self.bullets[bullet_id])
         bullet = Bullet(id=bullet_id, section=section, content=content)
         self.bullets[bullet_id] = bullet
         self.sections.setdefault(section, []).append(bullet_id)
+        self._index_insert(bullet)
         return bullet
 
     def update_bullet(
@@ -68,6 +102,7 @@ class Playbook(BaseModel):
         bullet = self.bullets.pop(bullet_id, None)
         if bullet is None:
             return
+        self._index_remove(bullet)
         section_list = self.sections.get(bullet.section)
         if section_list:
             self.sections[bullet.section] = [
@@ -85,7 +120,9 @@ class Playbook(BaseModel):
         bullet = self.bullets.get(bullet_id)
         if bullet is None:
             return None
+        self._index_remove(bullet)
         bullet.tag(tag, increment=increment)
+        self._index_insert(bullet)
         return bullet
 
     def get_bullet(self, bullet_id: str) -> Optional[Bullet]:
@@ -94,23 +131,55 @@ class Playbook(BaseModel):
     def bullets_list(self) -> List[Bullet]:
         return list(self.bullets.values())
 
+    def top_bullets(self, n: int) -> List[Bullet]:
+        """Return the ``n`` bullets with the highest decayed score."""
+        index = self._ensure_index()
+        return [self.bullets[bid] for _, bid in reversed(index[-n:])] if n > 0 else []
+
+    def bottom_bullets(self, n: int) -> List[Bullet]:
+        """Return the ``n`` bullets with the lowest decayed score."""
+        index = self._ensure_index()
+        return [self.bullets[bid] for _, bid in index[:n]] if n > 0 else []
+
     # ------------------------------------------------------------------ #
     # Serialization
     # ------------------------------------------------------------------ #
     def to_dict(self) -> Dict[str, object]:
-        return self.model_dump()
+        payload = self.model_dump()
+        # Bullet ids in ascending score order, so from_dict can restore the
+        # score index without sorting
+        payload["ranking"] = [bid for _, bid in self._ensure_index()]
+        return payload
 
     @classmethod
     def from_dict(cls, payload: Dict[str, object]) -> "Playbook":
-        return cls.model_validate(payload)
+        playbook = cls.model_validate(payload)
+        playbook._restore_index(payload.get("ranking"))
+        return playbook
 
     def dumps(self) -> str:
         # Use Pydantic JSON mode to ensure datetimes are ISO strings if present
-        return self.model_dump_json(indent=2)
+        return json.dumps(self.to_dict(), indent=2)
 
     @classmethod
     def loads(cls, data: str) -> "Playbook":
-        return cls.model_validate_json(data)
+        return cls.from_dict(json.loads(data))
+
+    def fingerprint(self) -> str:
+        """Hash of sections, bullet contents and tag counters.
+
+        Timestamps and decayed scores are left out so two playbooks built by
+        the same sequence of operations compare equal.
+        """
+        payload = {
+            "sections": self.sections,
+            "bullets": {
+                bid: [b.section, b.content, b.helpful, b.harmful, b.neutral]
+                for bid, b in self.bullets.items()
+            },
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
 
     # ------------------------------------------------------------------ #
     # Delta application
@@ -143,17 +212,96 @@ class Playbook(BaseModel):
     # Presentation helpers
     # ------------------------------------------------------------------ #
     def as_prompt(self) -> str:
-        """Return a human-readable playbook string for prompting LLMs."""
-        parts: List[str] = []
-        for section, bullet_ids in sorted(self.sections.items()):
-            parts.append(f"## {section}")
-            for bullet_id in bullet_ids:
-                bullet = self.bullets[bullet_id]
-                counters = f"(helpful={bullet.helpful}, harmful={bullet.harmful}, neutral={bullet.neutral})"
-                parts.append(f"- [{bullet.id}] {bullet.content} {counters}")
-        return "\n".join(parts)
+        """Return a human-readable playbook string for prompting LLMs.
+
+        Only stored fields are rendered, not decayed scores, so the text
+        depends on the playbook alone and not on the time it is rendered.
+        """
+        return "\n".join(self.render_section(section) for section in sorted(self.sections))
+
+    def render_bullet(self, bullet_id: str) -> str:
+        """Return the prompt line of one bullet."""
+        bullet = self.bullets[bullet_id]
+        counters = f"(helpful={bullet.helpful}, harmful={bullet.harmful}, neutral={bullet.neutral})"
+        return f"- [{bullet.id}] {bullet.content} {counters}"
+
+    def render_section(self, section: str, max_chars: Optional[int] = None) -> str:
+        """Return the prompt rendering of one section.
+
+        With ``max_chars`` and a longer full rendering, only the
+        highest-scoring bullets that fit are listed, in section order, with a
+        note of how many were shown. Returns an empty string if none fit.
+        """
+        header = f"## {section}"
+        bullet_ids = self.sections.get(section, [])
+        lines = [self.render_bullet(bullet_id) for bullet_id in bullet_ids]
+        rendering = "\n".join([header] + lines)
+        if max_chars is None or len(rendering) <= max_chars:
+            return rendering
+
+        note = f"({len(bullet_ids)} of {len(bullet_ids)} bullets shown)"
+        size = len(header) + 1 + len(note)
+        shown: List[int] = []
+        for i in sorted(
+            range(len(bullet_ids)),
+            key=lambda i: (-self.bullets[bullet_ids[i]].score_key, bullet_ids[i]),
+        ):
+            if size + len(lines[i]) + 1 <= max_chars:
+                shown.append(i)
+                size += len(lines[i]) + 1
+        if not shown:
+            return ""
+        return "\n".join(
+            [header]
+            + [lines[i] for i in sorted(shown)]
+            + [f"({len(shown)} of {len(bullet_ids)} bullets shown)"]
+        )
+
+    def section_digest(
+        self,
+        section: str,
+        summary: Optional[str] = None,
+        top: int = 2,
+        width: int = 80,
+    ) -> str:
+        """Return a one-line summary of a section for the collapsed view.
+
+        Lists the bullet count and summed tag counters, followed by
+        ``summary`` if given, else the ``top`` highest-scoring bullets
+        truncated to ``width`` characters.
+        """
+        bullets = [self.bullets[bid] for bid in self.sections.get(section, [])]
+        helpful = sum(b.helpful for b in bullets)
+        harmful = sum(b.harmful for b in bullets)
+        if summary is None:
+            best = sorted(bullets, key=lambda b: (-b.score_key, b.id))[:top]
+            summary = "e.g. " + "; ".join(
+                f"[{b.id}] {b.content if len(b.content) <= width else b.content[: width - 3] + '...'}"
+                for b in best
+            )
+        return (
+            f"## {section} ({len(bullets)} bullets, helpful={helpful}, harmful={harmful})"
+            f" {' '.join(summary.split())}"
+        )
+
+    def section_fingerprint(self, section: str, counters: bool = True) -> str:
+        """Hash of one section's bullet contents and tag counters.
+
+        Changes exactly when :meth:`section_digest` input changes, so it can
+        key a digest cache shared across playbook versions. With
+        ``counters=False`` only the bullet contents are hashed, so tagging
+        leaves it unchanged.
+        """
+        bullets = [self.bullets[bid] for bid in self.sections.get(section, [])]
+        payload = [
+            [b.id, b.content, b.helpful, b.harmful, b.neutral] if counters else [b.id, b.content]
+            for b in bullets
+        ]
+        encoded = json.dumps([section, payload], separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
 
     def stats(self) -> Dict[str, object]:
+        now = time.time()
         return {
             "sections": len(self.sections),
             "bullets": len(self.bullets),
@@ -162,11 +310,50 @@ class Playbook(BaseModel):
                 "harmful": sum(b.harmful for b in self.bullets.values()),
                 "neutral": sum(b.neutral for b in self.bullets.values()),
             },
+            "scores": {
+                "total": round(sum(b.score(now) for b in self.bullets.values()), 3),
+                "top": [(b.id, round(b.score(now), 3)) for b in self.top_bullets(3)],
+                "bottom": [(b.id, round(b.score(now), 3)) for b in self.bottom_bullets(3)],
+            },
         }
 
     # ------------------------------------------------------------------ #
     # Internal helpers
     # ------------------------------------------------------------------ #
+    def _ensure_index(self) -> List[Tuple[float, str]]:
+        if self._score_index is None:
+            self._score_index = sorted(
+                (b.score_key, b.id) for b in self.bullets.values()
+            )
+        return self._score_index
+
+    def _restore_index(self, ranking: Optional[List[str]]) -> None:
+        """Rebuild the score index from a stored ranking in O(n).
+
+        A ranking that doesn't match the bullets or isn't in score order is
+        ignored; the index is then sorted lazily on first use.
+        """
+        if not ranking or len(ranking) != len(self.bullets):
+            return
+        try:
+            index = [(self.bullets[bid].score_key, bid) for bid in ranking]
+        except KeyError:
+            return
+        if all(a <= b for a, b in zip(index, index[1:])):
+            self._score_index = index
+
+    def _index_insert(self, bullet: Bullet) -> None:
+        if self._score_index is not None:
+            insort(self._score_index, (bullet.score_key, bullet.id))
+
+    def _index_remove(self, bullet: Bullet) -> None:
+        if self._score_index is None:
+            return
+        entry = (bullet.score_key, bullet.id)
+        pos = bisect_left(self._score_index, entry)
+        if pos < len(self._score_index) and self._score_index[pos] == entry:
+            del self._score_index[pos]
+
     def _generate_id(self, section: str) -> str:
         self.next_id += 1
         section_prefix = (section or "general").split()[0].lower()
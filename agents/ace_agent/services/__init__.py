@@ -0,0 +1,4 @@
+from agents.ace_agent.services.batch import BatchItem, BatchRequest, BatchRunner
+from agents.ace_agent.services.sessions import ManagedSessionService, scratch_key
+
+__all__ = ["BatchItem", "BatchRequest", "BatchRunner", "ManagedSessionService", "scratch_key"]
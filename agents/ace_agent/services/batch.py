@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+from google.genai.types import Part, UserContent
+from pydantic import BaseModel, Field
+
+from agents.ace_agent.tenants import TENANT_KEY
+
+
+class BatchItem(BaseModel):
+    query: str
+    ground_truth: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(min_length=1)
+    user_id: str = "batch"
+    # Tenant whose playbook the items use; Config.default_tenant if unset
+    tenant_id: Optional[str] = None
+    # Capped by Config.batch_max_concurrency
+    concurrency: Optional[int] = Field(default=None, ge=1)
+
+
+class BatchRunner:
+    """Run many queries through one runner with a fixed pool of sessions.
+
+    Each of the ``concurrency`` workers owns one session and runs its items
+    through it back to back, so a batch creates at most ``concurrency``
+    sessions; they are deleted once the batch finishes or its consumer
+    stops iterating. Results are yielded in completion order, not input
+    order.
+    """
+
+    def __init__(self, runner: Runner, session_service: BaseSessionService, concurrency: int):
+        self.runner = runner
+        self.session_service = session_service
+        self.concurrency = concurrency
+
+    async def run(
+        self, items: List[BatchItem], user_id: str, tenant_id: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, object], None]:
+        pending: asyncio.Queue = asyncio.Queue()
+        for index, item in enumerate(items):
+            pending.put_nowait((index, item))
+        results: asyncio.Queue = asyncio.Queue()
+        submitted = time.perf_counter()
+        session_ids: List[str] = []
+
+        workers = [
+            asyncio.create_task(
+                self._worker(pending, results, session_ids, user_id, tenant_id, submitted)
+            )
+            for _ in range(min(self.concurrency, len(items)))
+        ]
+        try:
+            for _ in items:
+                yield await results.get()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(
+                *(
+                    self.session_service.delete_session(
+                        app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+                    )
+                    for session_id in session_ids
+                ),
+                # A failed delete must not hide the batch outcome from the caller
+                return_exceptions=True,
+            )
+
+    async def _worker(
+        self,
+        pending: asyncio.Queue,
+        results: asyncio.Queue,
+        session_ids: List[str],
+        user_id: str,
+        tenant_id: Optional[str],
+        submitted: float,
+    ) -> None:
+        session_id: Optional[str] = None
+        while not pending.empty():
+            index, item = pending.get_nowait()
+            if session_id is None:
+                try:
+                    session = await self.session_service.create_session(
+                        app_name=self.runner.app_name,
+                        user_id=user_id,
+                        state={TENANT_KEY: tenant_id} if tenant_id else None,
+                    )
+                except Exception as e:
+                    # Report the item instead of leaving run() waiting for it;
+                    # the next item retries with a new session
+                    await results.put(
+                        self._failed_item(index, item, f"{type(e).__name__}: {e}", submitted)
+                    )
+                    continue
+                session_id = session.id
+                session_ids.append(session_id)
+            await results.put(
+                await self._run_item(index, item, user_id, session_id, submitted)
+            )
+
+    @staticmethod
+    def _failed_item(
+        index: int, item: BatchItem, error: str, submitted: float
+    ) -> Dict[str, object]:
+        queued = round(time.perf_counter() - submitted, 6)
+        return {
+            "index": index,
+            "query": item.query,
+            "session_id": None,
+            "final_answer": None,
+            "bullet_ids": [],
+            "error": error,
+            "timing": {"queued_s": queued, "latency_s": 0.0},
+        }
+
+    async def _run_item(
+        self,
+        index: int,
+        item: BatchItem,
+        user_id: str,
+        session_id: str,
+        submitted: float,
+    ) -> Dict[str, object]:
+        started = time.perf_counter()
+        result: Dict[str, object] = {
+            "index": index,
+            "query": item.query,
+            "session_id": session_id,
+            "final_answer": None,
+            "bullet_ids": [],
+        }
+        try:
+            async for event in self.runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=UserContent(parts=[Part(text=item.query)]),
+                state_delta={"ground_truth": item.ground_truth},
+            ):
+                # Read the answer from the event; the session drops it at cycle end
+                delta = event.actions.state_delta if event.actions else None
+                output = delta.get("generator_output") if delta else None
+                if output:
+                    result["final_answer"] = output.get("final_answer")
+                    result["bullet_ids"] = output.get("bullet_ids", [])
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        result["timing"] = {
+            "queued_s": round(started - submitted, 6),
+            "latency_s": round(finished - started, 6),
+        }
+        return result
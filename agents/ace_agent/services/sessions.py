@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+# Per-turn keys written by the ACE cycle; they are rewritten every turn and
+# only needed until the cycle summary has been produced. The modules writing
+# them register them through scratch_key().
+SCRATCH_KEYS: Set[str] = set()
+
+
+def scratch_key(key: str) -> str:
+    """Register ``key`` as per-turn state dropped on compaction; returns it."""
+    SCRATCH_KEYS.add(key)
+    return key
+
+
+SessionKey = Tuple[str, str, str]
+
+
+class ManagedSessionService(InMemorySessionService):
+    """In-memory session store with per-cycle compaction and LRU/TTL eviction.
+
+    After an event authored by ``cycle_end_author`` is appended, the stored
+    session drops its per-turn scratch state and keeps only the most recent
+    ``max_events`` events. Sessions idle for longer than ``idle_ttl_seconds``
+    are evicted, and the least recently used sessions are evicted whenever
+    more than ``max_sessions`` are resident.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_ttl_seconds: float = 3600.0,
+        max_events: int = 50,
+        cycle_end_author: Optional[str] = None,
+    ):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_events = max_events
+        self.cycle_end_author = cycle_end_author
+        # Oldest access first; values are monotonic access timestamps
+        self._last_access: "OrderedDict[SessionKey, float]" = OrderedDict()
+        self.evicted = 0
+
+    # ------------------------------------------------------------------ #
+    # InMemorySessionService overrides
+    # ------------------------------------------------------------------ #
+    def _create_session_impl(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = super()._create_session_impl(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._touch((app_name, user_id, session.id))
+        self.evict_expired()
+        return session
+
+    def _get_session_impl(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = super()._get_session_impl(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None:
+            self._touch((app_name, user_id, session_id))
+        return session
+
+    def _delete_session_impl(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        # Pop directly; the base implementation deep-copies the session first
+        self.sessions.get(app_name, {}).get(user_id, {}).pop(session_id, None)
+        self._last_access.pop((app_name, user_id, session_id), None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        self._touch(key)
+        if (
+            self.cycle_end_author
+            and event.author == self.cycle_end_author
+            and not event.partial
+        ):
+            self.compact_session(*key)
+        return event
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def compact_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Drop per-turn scratch state and trim old events of a stored session."""
+        storage_session = self._storage_session(app_name, user_id, session_id)
+        if storage_session is None:
+            return
+        for key in SCRATCH_KEYS:
+            storage_session.state.pop(key, None)
+        if self.max_events >= 0 and len(storage_session.events) > self.max_events:
+            del storage_session.events[: len(storage_session.events) - self.max_events]
+        # Retained events still carry the scratch values in their state deltas.
+        # Store trimmed copies; the originals were already handed to the caller.
+        for i, event in enumerate(storage_session.events):
+            delta = event.actions.state_delta if event.actions else None
+            if not delta or not any(key in delta for key in SCRATCH_KEYS):
+                continue
+            trimmed = {k: v for k, v in delta.items() if k not in SCRATCH_KEYS}
+            storage_session.events[i] = event.model_copy(
+                update={"actions": event.actions.model_copy(update={"state_delta": trimmed})}
+            )
+
+    def evict_expired(self) -> int:
+        """Evict idle and over-capacity sessions, oldest first."""
+        now = time.monotonic()
+        evicted = 0
+        while self._last_access:
+            key, last_access = next(iter(self._last_access.items()))
+            expired = now - last_access > self.idle_ttl_seconds
+            over_capacity = len(self._last_access) > self.max_sessions
+            if not (expired or over_capacity):
+                break
+            self._delete_session_impl(
+                app_name=key[0], user_id=key[1], session_id=key[2]
+            )
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    async def run_sweeper(self, interval_seconds: float) -> None:
+        """Periodically evict idle sessions; run as a background task."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            self.evict_expired()
+
+    def memory_report(self) -> List[Dict[str, object]]:
+        """Approximate resident size of every stored session, largest first."""
+        now = time.monotonic()
+        report = []
+        for (app_name, user_id, session_id), last_access in self._last_access.items():
+            storage_session = self._storage_session(app_name, user_id, session_id)
+            if storage_session is None:
+                continue
+            report.append(
+                {
+                    "app_name": app_name,
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "events": len(storage_session.events),
+                    "state_keys": len(storage_session.state),
+                    "bytes": len(storage_session.model_dump_json()),
+                    "idle_seconds": round(now - last_access, 3),
+                }
+            )
+        report.sort(key=lambda item: item["bytes"], reverse=True)
+        return report
+
+    # ------------------------------------------------------------------ #
+    # Internal helpers
+    # ------------------------------------------------------------------ #
+    def _touch(self, key: SessionKey) -> None:
+        self._last_access[key] = time.monotonic()
+        self._last_access.move_to_end(key)
+
+    def _storage_session(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Optional[Session]:
+        return self.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
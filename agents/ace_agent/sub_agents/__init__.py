@@ -1,5 +1,5 @@
-from .curator import curator
-from .generator import generator
-from .reflector import reflector
+from agents.ace_agent.sub_agents.curator import curator
+from agents.ace_agent.sub_agents.generator import generator
+from agents.ace_agent.sub_agents.reflector import reflector
 
 __all__ = ["curator", "generator", "reflector"]
@@ -0,0 +1,188 @@
+import asyncio
+import re
+from collections import Counter
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai.types import GenerateContentResponseUsageMetadata
+
+from agents.ace_agent.services.sessions import scratch_key
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def normalize_answer(text: str) -> str:
+    return " ".join(str(text).lower().split()).strip(" .")
+
+
+def _as_number(text: str) -> Optional[float]:
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def answers_match(answer: str, ground_truth: str) -> bool:
+    """Whether ``answer`` states ``ground_truth``.
+
+    Normalized answers must be equal. For a numeric ground truth the last
+    number in the answer is compared instead, so "x = 4" matches "4" but
+    "14" and "40" do not.
+    """
+    answer, ground_truth = normalize_answer(answer), normalize_answer(ground_truth)
+    if answer == ground_truth:
+        return True
+    expected = _as_number(ground_truth)
+    if expected is None:
+        return False
+    numbers = _NUMBER.findall(answer.replace(",", ""))
+    return bool(numbers) and float(numbers[-1]) == expected
+
+
+class BestOfNAgent(BaseAgent):
+    """Sample the same LLM agent N times concurrently and keep one answer.
+
+    A sample agreeing with ``ground_truth`` wins as soon as it arrives.
+    Without ground truth, the first answer reaching ``quorum`` votes wins.
+    Either way the outstanding samples are cancelled. If no sample wins
+    early, the most common answer is kept. The winner is written to
+    ``output_key`` and the answers with their votes to ``samples_key``.
+    The token usage of the samples that finished is reported on that event.
+    """
+
+    output_key: str
+    samples_key: str
+    answer_key: str = "final_answer"
+    quorum: int
+
+    def _branch_ctx(self, ctx: InvocationContext, sample: BaseAgent) -> InvocationContext:
+        branch_ctx = ctx.model_copy()
+        suffix = f"{self.name}.{sample.name}"
+        branch_ctx.branch = f"{ctx.branch}.{suffix}" if ctx.branch else suffix
+        return branch_ctx
+
+    async def _sample(
+        self, ctx: InvocationContext, sample: BaseAgent, results: asyncio.Queue
+    ) -> None:
+        output: Optional[dict] = None
+        error: Optional[Exception] = None
+        usage = [0, 0, 0]  # prompt, candidates, total tokens
+        try:
+            # Sample events stay out of the session; only the winner is kept
+            async for event in sample.run_async(self._branch_ctx(ctx, sample)):
+                if event.usage_metadata:
+                    usage[0] += event.usage_metadata.prompt_token_count or 0
+                    usage[1] += event.usage_metadata.candidates_token_count or 0
+                    usage[2] += event.usage_metadata.total_token_count or 0
+                delta = event.actions.state_delta if event.actions else None
+                if delta and self.output_key in delta:
+                    output = delta[self.output_key]
+        except Exception as e:
+            output, error = None, e
+        await results.put((output, usage, error))
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        ground_truth = ctx.session.state.get("ground_truth")
+
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self._sample(ctx, sample, results))
+            for sample in self.sub_agents
+        ]
+        outputs: List[Tuple[str, dict]] = []
+        votes: Counter = Counter()
+        winner: Optional[dict] = None
+        errors: List[Exception] = []
+        usage = [0, 0, 0]
+        try:
+            for _ in tasks:
+                output, sample_usage, error = await results.get()
+                usage = [a + b for a, b in zip(usage, sample_usage)]
+                if error is not None:
+                    errors.append(error)
+                if not output or not output.get(self.answer_key):
+                    continue
+                answer = normalize_answer(output[self.answer_key])
+                outputs.append((answer, output))
+                votes[answer] += 1
+                if ground_truth is not None:
+                    if answers_match(output[self.answer_key], ground_truth):
+                        winner = output
+                        break
+                elif votes[answer] >= self.quorum:
+                    winner = output
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if not outputs:
+            cause = errors[0] if errors else None
+            raise RuntimeError(
+                f"All {len(tasks)} samples of {self.name} failed"
+                + (f", first with {type(cause).__name__}: {cause}" if cause else "")
+            ) from cause
+        if winner is None:
+            top_answer = votes.most_common(1)[0][0]
+            winner = next(output for answer, output in outputs if answer == top_answer)
+
+        answers: Dict[str, Dict[str, object]] = {}
+        for answer, output in outputs:
+            entry = answers.setdefault(
+                answer,
+                {
+                    self.answer_key: output[self.answer_key],
+                    "votes": 0,
+                    "bullet_ids": output.get("bullet_ids", []),
+                },
+            )
+            entry["votes"] += 1
+        samples = {
+            "samples": len(tasks),
+            "completed": len(outputs),
+            "failed": len(errors),
+            "cancelled": len(tasks) - len(outputs) - len(errors),
+            "winner": winner[self.answer_key],
+            "answers": sorted(answers.values(), key=lambda e: e["votes"], reverse=True),
+        }
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            usage_metadata=GenerateContentResponseUsageMetadata(
+                prompt_token_count=usage[0],
+                candidates_token_count=usage[1],
+                total_token_count=usage[2],
+            ),
+            actions=EventActions(
+                state_delta={self.output_key: winner, self.samples_key: samples}
+            ),
+        )
+
+
+def best_of_n(agent: LlmAgent, n: int, samples_key: Optional[str] = None) -> BaseAgent:
+    """Wrap ``agent`` in a :class:`BestOfNAgent` with ``n`` samples if ``n > 1``.
+
+    ``samples_key`` defaults to ``agent.output_key`` with ``_output``
+    replaced by ``_samples``.
+    """
+    if n <= 1:
+        return agent
+    samples = [
+        agent.clone(update={"name": f"{agent.name}_sample_{i}"}) for i in range(1, n + 1)
+    ]
+    return BestOfNAgent(
+        name=f"{agent.name}_best_of_{n}",
+        description=f"Samples {agent.name} {n} times concurrently and keeps the majority answer.",
+        sub_agents=samples,
+        output_key=agent.output_key,
+        samples_key=scratch_key(
+            samples_key or agent.output_key.replace("_output", "_samples")
+        ),
+        quorum=n // 2 + 1,
+    )
@@ -0,0 +1,171 @@
+import time
+from collections import Counter
+from typing import AsyncGenerator, Callable, Dict, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from pydantic import ConfigDict
+
+from agents.ace_agent.services.sessions import scratch_key
+from config import Config
+
+config = Config()
+
+# Returns None when the draft is accepted, otherwise the reason to escalate
+ConfidenceCheck = Callable[[dict, dict], Optional[str]]
+
+
+class CascadeStats:
+    """Per-stage escalation and cost counters for a :class:`CascadeAgent`."""
+
+    def __init__(self, draft_cost_ratio: float):
+        self.draft_cost_ratio = draft_cost_ratio
+        self.calls = 0
+        self.escalations = 0
+        self.reasons: Counter = Counter()
+        self.draft_latency_s = 0.0
+        self.strong_latency_s = 0.0
+        self.draft_tokens = 0
+        self.strong_tokens = 0
+
+    def report(self) -> Dict[str, object]:
+        report = {
+            "calls": self.calls,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalations / self.calls, 4) if self.calls else 0.0,
+            "reasons": dict(self.reasons),
+            "draft_latency_s": round(self.draft_latency_s, 6),
+            "strong_latency_s": round(self.strong_latency_s, 6),
+            "draft_tokens": self.draft_tokens,
+            "strong_tokens": self.strong_tokens,
+            "latency_saved_s": None,
+            "cost_saved_strong_tokens": None,
+        }
+        # Savings are measured against sending every call to the strong model,
+        # estimated from the mean of the escalated (strong) calls.
+        if self.escalations:
+            mean_latency = self.strong_latency_s / self.escalations
+            mean_tokens = self.strong_tokens / self.escalations
+            report["latency_saved_s"] = round(
+                self.calls * mean_latency - self.draft_latency_s - self.strong_latency_s, 6
+            )
+            report["cost_saved_strong_tokens"] = round(
+                self.calls * mean_tokens
+                - self.draft_tokens * self.draft_cost_ratio
+                - self.strong_tokens,
+                1,
+            )
+        return report
+
+
+cascade_stats: Dict[str, CascadeStats] = {}
+
+
+def cascade_report() -> Dict[str, Dict[str, object]]:
+    """Escalation rate and latency/cost savings for every cascaded stage."""
+    return {stage: stats.report() for stage, stats in cascade_stats.items()}
+
+
+def _event_tokens(event: Event) -> int:
+    usage = event.usage_metadata
+    return (usage.total_token_count or 0) if usage else 0
+
+
+class CascadeAgent(BaseAgent):
+    """Run a cheap draft agent first and escalate to the strong agent on doubt.
+
+    The draft writes to its own output key. When ``check`` accepts the draft
+    it is copied to ``output_key``; otherwise the strong agent runs as usual
+    and writes that key itself.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    output_key: str
+    check: ConfidenceCheck
+    stats: CascadeStats
+
+    @property
+    def draft(self) -> LlmAgent:
+        return self.sub_agents[0]
+
+    @property
+    def strong(self) -> BaseAgent:
+        return self.sub_agents[1]
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        self.stats.calls += 1
+        reason: Optional[str] = None
+
+        started = time.perf_counter()
+        try:
+            async for event in self.draft.run_async(ctx):
+                self.stats.draft_tokens += _event_tokens(event)
+                yield event
+        except Exception as e:
+            # Malformed structured output from the draft model is a failed check
+            reason = f"draft_error:{type(e).__name__}"
+        self.stats.draft_latency_s += time.perf_counter() - started
+
+        draft_output: dict | None = ctx.session.state.get(self.draft.output_key)
+        if reason is None:
+            if not draft_output:
+                reason = "no_draft"
+            else:
+                reason = self.check(draft_output, ctx.session.state)
+
+        if reason is None:
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                actions=EventActions(
+                    state_delta={self.output_key: draft_output}
+                ),
+            )
+            return
+
+        self.stats.escalations += 1
+        self.stats.reasons[reason.split(":", 1)[0]] += 1
+        started = time.perf_counter()
+        async for event in self.strong.run_async(ctx):
+            self.stats.strong_tokens += _event_tokens(event)
+            yield event
+        self.stats.strong_latency_s += time.perf_counter() - started
+
+
+def cascade(
+    strong: LlmAgent,
+    draft_model: Optional[str],
+    check: ConfidenceCheck,
+    escalation: Optional[BaseAgent] = None,
+) -> BaseAgent:
+    """Wrap ``strong`` in a :class:`CascadeAgent` if a draft model is configured.
+
+    The draft is a clone of ``strong`` on ``draft_model``. Failed drafts are
+    escalated to ``escalation``, which defaults to ``strong`` itself and must
+    write ``strong.output_key``.
+    """
+    escalation = escalation or strong
+    if not draft_model:
+        return escalation
+    draft = strong.clone(
+        update={
+            "name": f"{strong.name}_draft",
+            "model": draft_model,
+            "output_key": scratch_key(f"{strong.output_key}_draft"),
+        }
+    )
+    stats = cascade_stats.setdefault(
+        strong.name, CascadeStats(config.cascade_draft_cost_ratio)
+    )
+    return CascadeAgent(
+        name=f"{strong.name}_cascade",
+        description=f"Tries {draft_model} first and escalates to {strong.model} on low confidence.",
+        sub_agents=[draft, escalation],
+        output_key=strong.output_key,
+        check=check,
+        stats=stats,
+    )
@@ -5,7 +5,15 @@ from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from google.genai.types import Part, UserContent
 
-from agents.ace_agent.schemas import DeltaBatch, Playbook
+from agents.ace_agent.prompts import (
+    playbook_state_delta,
+    prefix_first_instruction,
+    stored_playbook,
+)
+from agents.ace_agent.replay import record_model_request, record_model_response
+from agents.ace_agent.schemas import DeltaBatch
+from agents.ace_agent.services.sessions import scratch_key
+from agents.ace_agent.tracing import span
 from config import Config
 
 config = Config()
@@ -13,11 +21,8 @@ config = Config()
 # ============================================
 # Curator: Expert in curating playbooks
 # ============================================
-curator_ = Agent(
-    name="Curator",
-    model=config.curator_model,
-    description="Expert playbook curator that adds new insights, updates existing strategies, and removes outdated or incorrect advice based on reflection results.",
-    instruction="""You are an expert in curating playbooks.
+# Static instruction first, then the playbook (see prompts.py), then the query
+CURATOR_INSTRUCTION = """You are an expert in curating playbooks.
 
 Considering the existing playbook and reflections from previous attempts:
 - Identify only new insights, strategies, and failures that are **missing** from the current playbook
@@ -27,11 +32,6 @@ Considering the existing playbook and reflections from previous attempts:
 - Focus on quality over quantity - a focused and organized playbook is better than a comprehensive one
 - Each change must be specific and justified
 
-Input:
-- User Query: {user_query}
-- Reflector Results: {reflector_output}
-- Current Playbook: {app:playbook}
-
 CRITICAL RULES:
 1. You MUST respond with ONLY valid JSON - no markdown, no explanations, no code blocks
 2. Maximum 3 operations per response - NO EXCEPTIONS
@@ -53,12 +53,25 @@ Response format:
   ]
 }
 
-REMEMBER: Output MUST be valid JSON. Keep it SHORT and SIMPLE.""",
+REMEMBER: Output MUST be valid JSON. Keep it SHORT and SIMPLE."""
+
+CURATOR_INPUT = """Input:
+- User Query: {user_query}
+- Reflector Results: {reflector_output}
+"""
+
+curator_ = Agent(
+    name="Curator",
+    model=config.curator_model,
+    description="Expert playbook curator that adds new insights, updates existing strategies, and removes outdated or incorrect advice based on reflection results.",
+    instruction=prefix_first_instruction(CURATOR_INSTRUCTION, CURATOR_INPUT),
     include_contents="none",
     output_schema=DeltaBatch,
-    output_key="curator_output",
+    output_key=scratch_key("curator_output"),
     disallow_transfer_to_parent=True,
     disallow_transfer_to_peers=True,
+    before_model_callback=record_model_request,
+    after_model_callback=record_model_response,
 )
 
 
@@ -70,7 +83,8 @@ class PlaybookUpdater(BaseAgent):
         curator_output: dict | None = state.get("curator_output")
         
         try:
-            delta_batch = DeltaBatch.from_dict(curator_output)
+            with span("DeltaBatch.from_dict"):
+                delta_batch = DeltaBatch.from_dict(curator_output)
         except Exception as e:
             # Handle malformed curator output gracefully
             error_msg = f"Error parsing curator output: {str(e)}"
@@ -85,16 +99,16 @@ class PlaybookUpdater(BaseAgent):
             )
             return
 
-        playbook: dict | None = state.get("app:playbook")
-        playbook: Playbook = Playbook.from_dict(playbook)
+        playbook, version = stored_playbook(state)
         
         # Limit operations to prevent overflow
         if len(delta_batch.operations) > 3:
             delta_batch.operations = delta_batch.operations[:3]
         
-        playbook.apply_delta(delta_batch)
+        with span("Playbook.apply_delta", operations=len(delta_batch.operations)):
+            playbook.apply_delta(delta_batch)
 
-        state_changes = {"app:playbook": playbook.to_dict()}
+        state_changes = playbook_state_delta(playbook, state, previous=version)
 
         # Emit event (display text)
         ops = delta_batch.operations
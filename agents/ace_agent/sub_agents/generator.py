@@ -1,11 +1,17 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from google.adk.agents import Agent, BaseAgent, SequentialAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from google.genai.types import Part, UserContent
-from pydantic import BaseModel, Field
-
+from pydantic import BaseModel, Field, ValidationError
+
+from agents.ace_agent.prompts import PLAYBOOK_KEY, prefix_first_instruction
+from agents.ace_agent.replay import record_model_request, record_model_response
+from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.services.sessions import scratch_key
+from agents.ace_agent.sub_agents.best_of_n import answers_match, best_of_n
+from agents.ace_agent.sub_agents.cascade import cascade
 from config import Config
 
 config = Config()
@@ -27,17 +33,10 @@ class GeneratorOutput(BaseModel):
 # ============================================
 # Generator: Generate answers and traces using playbook
 # ============================================
-generator_ = Agent(
-    name="Generator",
-    model=config.generator_model,
-    description="Generates high-quality answers by applying strategies from the learned playbook. References specific tactics and avoids known pitfalls.",
-    instruction="""
+# Static instruction first, then the playbook (see prompts.py), then the query
+GENERATOR_INSTRUCTION = """
 Your task is to answer user queries while providing structured step-by-step reasoning and the bullet IDs you used.
 
-Input:
-- User Query: {user_query}
-- Current Playbook: {app:playbook}
-
 【Required Guidelines】
 
 1. Carefully read the playbook and apply relevant strategies, formulas, and insights
@@ -64,15 +63,55 @@ Input:
 - reasoning: Step-by-step thought process (step-by-step chain of thought), detailed analysis and calculations
 - bullet_ids: List of referenced playbook bullet IDs
 - final_answer: Clear and verified final answer
-""",
+"""
+
+GENERATOR_INPUT = """Input:
+- User Query: {user_query}
+"""
+
+# Best-of-N sample summary; StateInitializer clears it every turn
+GENERATOR_SAMPLES_KEY = scratch_key("generator_samples")
+
+generator_ = Agent(
+    name="Generator",
+    model=config.generator_model,
+    description="Generates high-quality answers by applying strategies from the learned playbook. References specific tactics and avoids known pitfalls.",
+    instruction=prefix_first_instruction(
+        GENERATOR_INSTRUCTION, GENERATOR_INPUT, config.generator_playbook_budget_chars
+    ),
     include_contents="none",  # Focus on state value injection
     output_schema=GeneratorOutput,  # Structure output
-    output_key="generator_output",  # Save to session.state['generator_output']
+    output_key=scratch_key("generator_output"),  # Save to session.state['generator_output']
     disallow_transfer_to_parent=True,
     disallow_transfer_to_peers=True,
+    before_model_callback=record_model_request,
+    after_model_callback=record_model_response,
 )
 
 
+def check_generator_draft(draft: dict, state: dict) -> Optional[str]:
+    """Local confidence checks for a draft Generator answer."""
+    try:
+        output = GeneratorOutput.model_validate(draft)
+    except ValidationError:
+        return "schema"
+    if not output.final_answer.strip():
+        return "empty_answer"
+
+    ground_truth = state.get("ground_truth")
+    if ground_truth is not None and not answers_match(output.final_answer, ground_truth):
+        return "ground_truth_mismatch"
+
+    playbook = Playbook.from_dict(state.get(PLAYBOOK_KEY) or {})
+    for bullet_id in output.bullet_ids:
+        bullet = playbook.get_bullet(bullet_id)
+        if bullet is None:
+            return f"unknown_bullet:{bullet_id}"
+        if bullet.helpful < config.cascade_min_helpful or bullet.harmful >= bullet.helpful:
+            return f"weak_bullet:{bullet_id}"
+    return None
+
+
 class FinalAnswerDisplay(BaseAgent):
     """Display the final answer prominently to the user."""
     
@@ -93,6 +132,11 @@ class FinalAnswerDisplay(BaseAgent):
             return
         
         output = GeneratorOutput.model_validate(generator_output)
+        samples: dict | None = state.get(GENERATOR_SAMPLES_KEY)
+        agreement = ""
+        if samples:
+            votes = samples["answers"][0]["votes"] if samples["answers"] else 0
+            agreement = f"Samples: {samples['completed']}/{samples['samples']} completed, top answer votes: {votes}"
         
         # Create a beautifully formatted final answer display
         answer_display = f"""
@@ -106,6 +150,7 @@ Reasoning Steps: {len(output.reasoning)}
 Playbook Bullets Used: {len(output.bullet_ids)}
 {f"Referenced: {', '.join(output.bullet_ids[:5])}" if output.bullet_ids else ""}
 {f"   ... and {len(output.bullet_ids) - 5} more" if len(output.bullet_ids) > 5 else ""}
+{agreement}
 """
         
         content = UserContent(parts=[Part(text=answer_display)])
@@ -127,6 +172,14 @@ final_answer_display = FinalAnswerDisplay(
 generator = SequentialAgent(
     name="Generator",
     description="Generates answers and displays the final result prominently.",
-    sub_agents=[generator_, final_answer_display],
+    sub_agents=[
+        cascade(
+            generator_,
+            config.generator_draft_model,
+            check_generator_draft,
+            escalation=best_of_n(generator_, config.generator_samples, GENERATOR_SAMPLES_KEY),
+        ),
+        final_answer_display,
+    ],
 )
 
@@ -1,12 +1,22 @@
-from typing import AsyncGenerator, Literal
+from typing import AsyncGenerator, Literal, Optional
 
 from google.adk.agents import Agent, BaseAgent, SequentialAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from google.genai.types import Part, UserContent
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
-from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.analytics import record_usage
+from agents.ace_agent.prompts import (
+    playbook_state_delta,
+    prefix_first_instruction,
+    stored_playbook,
+)
+from agents.ace_agent.replay import record_model_request, record_model_response
+from agents.ace_agent.services.sessions import scratch_key
+from agents.ace_agent.sub_agents.cascade import cascade
+from agents.ace_agent.tenants import tenant_of
+from agents.ace_agent.tracing import span
 from config import Config
 
 config = Config()
@@ -47,18 +57,10 @@ class Reflection(BaseModel):
 # ============================================
 # Reflector: Critically analyze errors/patterns
 # ============================================
-reflector_ = Agent(
-    name="Reflector",
-    model=config.reflector_model,
-    description="Critically analyzes the Generator's output, identifies errors and patterns, and tags playbook bullets as helpful, harmful, or neutral.",
-    instruction="""
+# Static instruction first, then the playbook (see prompts.py), then the query
+REFLECTOR_INSTRUCTION = """
 Your task is to carefully examine the generator's output, critically analyze it, and create a reflection (JSON).
 
-Input:
-- User query: {user_query}
-- Generator output: {generator_output}
-- Generator-referenced playbook bullet: {app:playbook}
-
 【Required Analysis Steps】
 
 1. Carefully analyze the model's reasoning trace to understand where errors occurred
@@ -86,15 +88,45 @@ Input:
 - correct_approach: What should the generator have done instead? Present accurate steps and logic
 - key_insight: Strategy, formula, principle, or checklist that should be remembered to avoid such errors
 - bullet_tags: Tagging results for each bullet referenced by the generator (including id and 'helpful'/'harmful'/'neutral')
-""",
+"""
+
+REFLECTOR_INPUT = """Input:
+- User query: {user_query}
+- Generator output: {generator_output}
+- Generator samples and their disagreements (if sampled): {generator_samples?}
+"""
+
+reflector_ = Agent(
+    name="Reflector",
+    model=config.reflector_model,
+    description="Critically analyzes the Generator's output, identifies errors and patterns, and tags playbook bullets as helpful, harmful, or neutral.",
+    instruction=prefix_first_instruction(REFLECTOR_INSTRUCTION, REFLECTOR_INPUT),
     include_contents="none",
     output_schema=Reflection,
-    output_key="reflector_output",  # session.state['reflector_output']
+    output_key=scratch_key("reflector_output"),  # session.state['reflector_output']
     disallow_transfer_to_parent=True,
     disallow_transfer_to_peers=True,
+    before_model_callback=record_model_request,
+    after_model_callback=record_model_response,
 )
 
 
+def check_reflector_draft(draft: dict, state: dict) -> Optional[str]:
+    """Local confidence checks for a draft Reflection."""
+    try:
+        reflection = Reflection.from_dict(draft)
+    except ValidationError:
+        return "schema"
+    if not reflection.key_insight.strip():
+        return "empty_insight"
+
+    cited = set((state.get("generator_output") or {}).get("bullet_ids", []))
+    for bullet_tag in reflection.bullet_tags:
+        if bullet_tag.id not in cited:
+            return f"uncited_bullet:{bullet_tag.id}"
+    return None
+
+
 class TagBullet(BaseAgent):
     async def _run_async_impl(
         self, ctx: InvocationContext
@@ -102,11 +134,11 @@ class TagBullet(BaseAgent):
         state = ctx.session.state
 
         reflector_output: dict | None = state.get("reflector_output")
-        reflector_output: Reflection = Reflection.from_dict(reflector_output)
+        with span("Reflection.from_dict"):
+            reflector_output: Reflection = Reflection.from_dict(reflector_output)
         bullet_tags = reflector_output.bullet_tags
 
-        playbook: dict | None = state.get("app:playbook")
-        playbook: Playbook = Playbook.from_dict(playbook)
+        playbook, version = stored_playbook(state)
 
         # Build display lines for tagging summary
         tag_lines: list[str] = []
@@ -116,7 +148,14 @@ class TagBullet(BaseAgent):
             playbook.update_bullet_tag(bullet_id=bullet_id, tag=tag)
             tag_lines.append(f"- [{bullet_id}] {tag}")
 
-        state_changes = {"app:playbook": playbook.to_dict()}
+        state_changes = playbook_state_delta(playbook, state, previous=version)
+
+        generator_output: dict | None = state.get("generator_output")
+        record_usage(
+            tenant_of(state),
+            cited=(generator_output or {}).get("bullet_ids", []),
+            tags=[(bullet_tag.id, bullet_tag.tag) for bullet_tag in bullet_tags],
+        )
         pretty = "\n".join(tag_lines) or "(no changes)"
         content = UserContent(
             parts=[Part(text=f"[Reflector] Bullet Tagging Results:\n{pretty}")]
@@ -134,5 +173,8 @@ tag_bullet = TagBullet(name="tag_bullet", description="Tags bullets.")
 reflector = SequentialAgent(
     name="Reflector",
     description="Analyzes Generator output and tags playbook bullets for quality improvement.",
-    sub_agents=[reflector_, tag_bullet],
+    sub_agents=[
+        cascade(reflector_, config.reflector_draft_model, check_reflector_draft),
+        tag_bullet,
+    ],
 )
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from agents.ace_agent.schemas.playbook import Playbook
+from config import Config
+
+config = Config()
+
+# Session state key selecting the tenant whose playbook a cycle uses. Set it
+# at session creation or per run through ``state_delta``.
+TENANT_KEY = "tenant_id"
+
+
+class _Resident:
+    __slots__ = ("data", "version", "bytes", "dirty")
+
+    def __init__(self, data: Dict[str, object], version: str, size: int, dirty: bool):
+        self.data = data
+        self.version = version
+        self.bytes = size
+        self.dirty = dirty
+
+
+class TenantPlaybookStore:
+    """Per-tenant playbooks, loaded on first use and kept in an LRU.
+
+    Playbooks are stored as ``<path>/<tenant>.json``. Resident playbooks are
+    measured by their JSON size; once the total exceeds ``quota_bytes`` the
+    least recently used tenants are written back (if changed) and unloaded.
+    Changes to resident tenants are only on disk after :meth:`flush`, which
+    :meth:`run_flusher` calls periodically, so a crash loses at most one
+    flush interval of learning. Without ``path`` every tenant stays resident
+    and the quota is not enforced.
+    """
+
+    def __init__(self, path: Optional[str], quota_bytes: int):
+        self.path = path
+        self.quota_bytes = quota_bytes
+        self._resident: "OrderedDict[str, _Resident]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def get(self, tenant: str) -> Tuple[Dict[str, object], str]:
+        """Return ``(playbook dict, version)`` for ``tenant``, loading it if cold."""
+        with self._lock:
+            entry = self._resident.get(tenant)
+            if entry is not None:
+                self._resident.move_to_end(tenant)
+                self.hits += 1
+                return entry.data, entry.version
+
+            self.misses += 1
+            started = time.perf_counter()
+            playbook = self._read(tenant) or Playbook()
+            data = playbook.to_dict()
+            entry = _Resident(data, playbook.fingerprint(), self._size(data), dirty=False)
+            elapsed = time.perf_counter() - started
+            self.load_seconds += elapsed
+            self.max_load_seconds = max(self.max_load_seconds, elapsed)
+            self._admit(tenant, entry)
+            return entry.data, entry.version
+
+    def put(self, tenant: str, data: Dict[str, object], version: str) -> None:
+        """Replace the resident playbook of ``tenant``; written back on unload."""
+        with self._lock:
+            old = self._resident.pop(tenant, None)
+            if old is not None:
+                self.resident_bytes -= old.bytes
+            self._admit(tenant, _Resident(data, version, self._size(data), dirty=True))
+
+    def flush(self) -> int:
+        """Write every changed resident playbook to disk."""
+        written = 0
+        with self._lock:
+            for tenant, entry in self._resident.items():
+                if entry.dirty and self._write(tenant, entry):
+                    written += 1
+        return written
+
+    async def run_flusher(self, interval_seconds: float) -> None:
+        """Periodically write back changed playbooks; run as a background task."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "resident_tenants": len(self._resident),
+                "resident_bytes": self.resident_bytes,
+                "quota_bytes": self.quota_bytes if self.path else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "load_latency_s": {
+                    "mean": round(self.load_seconds / self.misses, 6) if self.misses else 0.0,
+                    "max": round(self.max_load_seconds, 6),
+                },
+            }
+
+    # ------------------------------------------------------------------ #
+    # Internal helpers
+    # ------------------------------------------------------------------ #
+    def _admit(self, tenant: str, entry: _Resident) -> None:
+        self._resident[tenant] = entry
+        self.resident_bytes += entry.bytes
+        if not self.path:
+            return
+        # Unload cold tenants, never the one just admitted
+        while self.resident_bytes > self.quota_bytes and len(self._resident) > 1:
+            cold_tenant, cold = self._resident.popitem(last=False)
+            if cold.dirty:
+                self._write(cold_tenant, cold)
+            self.resident_bytes -= cold.bytes
+            self.evictions += 1
+
+    def _file(self, tenant: str) -> str:
+        return os.path.join(self.path, quote(tenant, safe="") + ".json")
+
+    def _read(self, tenant: str) -> Optional[Playbook]:
+        if not self.path or not os.path.exists(self._file(tenant)):
+            return None
+        with open(self._file(tenant), encoding="utf-8") as fh:
+            return Playbook.loads(fh.read())
+
+    def _write(self, tenant: str, entry: _Resident) -> bool:
+        if not self.path:
+            return False
+        path = self._file(tenant)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(entry.data, fh, default=str)
+        os.replace(path + ".tmp", path)
+        entry.dirty = False
+        self.writes += 1
+        return True
+
+    @staticmethod
+    def _size(data: Dict[str, object]) -> int:
+        return len(json.dumps(data, default=str, separators=(",", ":")))
+
+
+tenant_store = TenantPlaybookStore(config.tenant_dir, config.tenant_memory_quota_bytes)
+
+
+def tenant_of(state) -> str:
+    return state.get(TENANT_KEY) or config.default_tenant
+
+
+def load_playbook(tenant: str) -> Tuple[Dict[str, object], str]:
+    """``(playbook dict, version)`` of ``tenant`` from the tenant store."""
+    return tenant_store.get(tenant)
+
+
+def save_playbook(tenant: str, data: Dict[str, object], version: str) -> None:
+    tenant_store.put(tenant, data, version)
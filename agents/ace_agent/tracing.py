@@ -0,0 +1,243 @@
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+from config import Config
+
+config = Config()
+
+tracer = trace.get_tracer("ace_agent")
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[trace.Span]:
+    """Open a span named ``name`` under the current agent span."""
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+# ============================================
+# OTLP/JSON file exporter
+# ============================================
+def _otlp_value(value) -> Dict[str, object]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes) -> List[Dict[str, object]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in (attributes or {}).items()]
+
+
+def _otlp_span(span_: ReadableSpan) -> Dict[str, object]:
+    ctx = span_.get_span_context()
+    payload = {
+        "traceId": format(ctx.trace_id, "032x"),
+        "spanId": format(ctx.span_id, "016x"),
+        "name": span_.name,
+        # OTLP SpanKind enum is offset by one from the SDK enum
+        "kind": span_.kind.value + 1,
+        "startTimeUnixNano": str(span_.start_time),
+        "endTimeUnixNano": str(span_.end_time),
+        "attributes": _otlp_attributes(span_.attributes),
+        "status": {"code": span_.status.status_code.value},
+    }
+    if span_.parent is not None:
+        payload["parentSpanId"] = format(span_.parent.span_id, "016x")
+    if span_.status.description:
+        payload["status"]["message"] = span_.status.description
+    return payload
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Append finished spans to ``path`` as OTLP/JSON, one request per line.
+
+    Each line is an ``ExportTraceServiceRequest`` in the OTLP/JSON encoding,
+    the same layout the OpenTelemetry Collector ``file`` exporter writes and
+    its ``otlpjson`` receiver reads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        by_resource: Dict[int, Tuple[object, List[ReadableSpan]]] = {}
+        for span_ in spans:
+            entry = by_resource.setdefault(id(span_.resource), (span_.resource, []))
+            entry[1].append(span_)
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes(resource.attributes)},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "ace_agent"},
+                            "spans": [_otlp_span(s) for s in resource_spans],
+                        }
+                    ],
+                }
+                for resource, resource_spans in by_resource.values()
+            ]
+        }
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+        return SpanExportResult.SUCCESS
+
+
+def add_file_exporter(provider: TracerProvider, path: str) -> None:
+    """Register a :class:`JsonFileSpanExporter` on ``provider``."""
+    provider.add_span_processor(SimpleSpanProcessor(JsonFileSpanExporter(path)))
+
+
+# ============================================
+# Sampling profiler for the slowest cycles
+# ============================================
+class _Sampler(threading.Thread):
+    """Sample the stack of one thread into folded-stack counts.
+
+    Stops on its own after ``max_seconds`` in case it is never stopped.
+    """
+
+    def __init__(self, thread_id: int, interval: float, max_seconds: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.deadline = time.monotonic() + max_seconds
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            if time.monotonic() > self.deadline:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+class CycleProfiler:
+    """Keep folded stack samples for the ``keep`` slowest cycles.
+
+    Sampling follows the thread running the cycle, which is the event loop
+    thread, so cycles running concurrently share their samples. ADK skips
+    ``after_agent_callback`` when a cycle raises, so cycles not stopped
+    within ``timeout_seconds`` are dropped on the next :meth:`start`.
+    """
+
+    def __init__(
+        self,
+        keep: int,
+        out_dir: str,
+        interval_ms: float = 5.0,
+        timeout_seconds: float = 600.0,
+    ):
+        self.keep = keep
+        self.out_dir = out_dir
+        self.interval = interval_ms / 1000.0
+        self.timeout_seconds = timeout_seconds
+        self._active: Dict[str, Tuple[float, _Sampler]] = {}
+        # Min-heap of (duration, invocation_id, path) for the slowest cycles
+        self._slowest: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()
+
+    def start(self, invocation_id: str) -> None:
+        self._drop_stale()
+        sampler = _Sampler(threading.get_ident(), self.interval, self.timeout_seconds)
+        self._active[invocation_id] = (time.perf_counter(), sampler)
+        sampler.start()
+
+    def _drop_stale(self) -> None:
+        now = time.perf_counter()
+        for invocation_id, (started, sampler) in list(self._active.items()):
+            if now - started > self.timeout_seconds:
+                del self._active[invocation_id]
+                sampler.stop()
+
+    def stop(self, invocation_id: str) -> Optional[str]:
+        entry = self._active.pop(invocation_id, None)
+        if entry is None:
+            return None
+        started, sampler = entry
+        stacks = sampler.stop()
+        duration = time.perf_counter() - started
+        with self._lock:
+            if len(self._slowest) >= self.keep and duration <= self._slowest[0][0]:
+                return None
+            path = os.path.join(
+                self.out_dir, f"cycle-{int(duration * 1000)}ms-{invocation_id}.folded"
+            )
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as fh:
+                for stack, count in stacks.most_common():
+                    fh.write(f"{stack} {count}\n")
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, (duration, invocation_id, path))
+            else:
+                _, _, evicted = heapq.heapreplace(
+                    self._slowest, (duration, invocation_id, path)
+                )
+                if os.path.exists(evicted):
+                    os.remove(evicted)
+        return path
+
+    def slowest(self) -> List[Tuple[float, str, str]]:
+        """Return (duration, invocation_id, path) entries, slowest first."""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+
+profiler: Optional[CycleProfiler] = (
+    CycleProfiler(
+        keep=config.profile_slowest_cycles,
+        out_dir=config.profile_dir,
+        interval_ms=config.profile_interval_ms,
+        timeout_seconds=config.cycle_timeout_seconds,
+    )
+    if config.profile_slowest_cycles > 0
+    else None
+)
+
+
+def start_cycle_profile(callback_context: CallbackContext) -> None:
+    """``before_agent_callback`` for the root agent."""
+    if profiler is not None:
+        profiler.start(callback_context.invocation_id)
+
+
+def stop_cycle_profile(callback_context: CallbackContext) -> None:
+    """``after_agent_callback`` for the root agent."""
+    if profiler is not None:
+        profiler.stop(callback_context.invocation_id)
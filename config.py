@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
@@ -18,3 +19,51 @@ class Config(BaseModel):
     app_version: str = Field(default="0.1.0")
     server_host: str = Field(default="0.0.0.0")
     server_port: int = Field(default=8080)
+
+    # Session lifecycle configuration
+    session_max_sessions: int = Field(default=1000)
+    session_idle_ttl_seconds: float = Field(default=3600.0)
+    session_max_events: int = Field(default=50)
+    session_sweep_interval_seconds: float = Field(default=60.0)
+
+    # Tenant playbooks: one playbook per session state "tenant_id"
+    default_tenant: str = Field(default="default")
+    tenant_dir: Optional[str] = Field(default=None)  # None keeps every tenant in memory
+    tenant_memory_quota_bytes: int = Field(default=256 * 1024 * 1024)  # Resident playbook JSON
+    tenant_flush_interval_seconds: float = Field(default=60.0)  # Max learning lost on a crash
+
+    # Bulk query endpoint (POST /batch)
+    batch_max_concurrency: int = Field(default=4)  # Concurrent cycles per batch
+
+    # Tracing / profiling configuration
+    trace_file: Optional[str] = Field(default=None)  # OTLP/JSON span log
+    profile_slowest_cycles: int = Field(default=0)  # 0 disables the profiler
+    profile_dir: str = Field(default="profiles")
+    profile_interval_ms: float = Field(default=5.0)
+    # Cycles still open after this long are treated as failed and their
+    # profiler / recorder bookkeeping is dropped
+    cycle_timeout_seconds: float = Field(default=600.0)
+
+    # Model cascade: try a cheaper draft model first, None disables
+    generator_draft_model: Optional[str] = Field(default=None)
+    reflector_draft_model: Optional[str] = Field(default=None)
+    cascade_min_helpful: int = Field(default=1)  # Cited bullets must be this helpful
+    cascade_draft_cost_ratio: float = Field(default=0.25)  # Draft/strong token price
+
+    # Best-of-N: concurrent Generator samples for escalated queries, 1 disables
+    generator_samples: int = Field(default=1)
+
+    # Hierarchical playbook rendering for the Generator: above this many
+    # characters the playbook is shown as section digests plus the sections
+    # most relevant to the query; 0 always renders every bullet
+    generator_playbook_budget_chars: int = Field(default=12000)
+    digest_model: Optional[str] = Field(default=None)  # Background LLM section digests
+    prompt_cache_max_handles: int = Field(default=256)  # Rendered prefixes kept, least recently used dropped
+
+    # Bullet citation/tag analytics store (agents/ace_agent/analytics.py), None disables
+    analytics_dir: Optional[str] = Field(default=None)
+    # Co-cited bullets added to the expanded Generator playbook sections
+    prefetch_related_bullets: int = Field(default=5)
+
+    # Record model calls for offline replay (agents/ace_agent/replay.py)
+    record_file: Optional[str] = Field(default=None)
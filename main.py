@@ -1,16 +1,114 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+import google.adk.cli
 import uvicorn
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from google.adk.cli.fast_api import get_fast_api_app
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse, StreamingResponse
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.auth.credential_service.in_memory_credential_service import (
+    InMemoryCredentialService,
+)
+from google.adk.cli.adk_web_server import AdkWebServer
+from google.adk.cli.utils.agent_change_handler import AgentChangeEventHandler
+from google.adk.cli.utils.agent_loader import AgentLoader
+from google.adk.evaluation.local_eval_set_results_manager import (
+    LocalEvalSetResultsManager,
+)
+from google.adk.evaluation.local_eval_sets_manager import LocalEvalSetsManager
+from google.adk.memory import InMemoryMemoryService
 
+from agents.ace_agent.agent import cycle_summary
+from agents.ace_agent.analytics import usage_store
+from agents.ace_agent.prompts import prompt_cache
+from agents.ace_agent.services import BatchRequest, BatchRunner, ManagedSessionService
+from agents.ace_agent.sub_agents.cascade import cascade_report
+from agents.ace_agent.tenants import load_playbook, tenant_store
+from agents.ace_agent.tracing import add_file_exporter, profiler
 from config import Config
 
 config = Config()
 
-app: FastAPI = get_fast_api_app(
+# Bounded session store: compacts each session once its cycle summary is
+# emitted and evicts idle / least recently used sessions.
+session_service = ManagedSessionService(
+    max_sessions=config.session_max_sessions,
+    idle_ttl_seconds=config.session_idle_ttl_seconds,
+    max_events=config.session_max_events,
+    cycle_end_author=cycle_summary.name,
+)
+
+agent_loader = AgentLoader(config.agent_dir)
+
+adk_web_server = AdkWebServer(
+    agent_loader=agent_loader,
+    session_service=session_service,
+    artifact_service=InMemoryArtifactService(),
+    memory_service=InMemoryMemoryService(),
+    credential_service=InMemoryCredentialService(),
+    eval_sets_manager=LocalEvalSetsManager(agents_dir=config.agent_dir),
+    eval_set_results_manager=LocalEvalSetResultsManager(agents_dir=config.agent_dir),
     agents_dir=config.agent_dir,
-    web=config.serve_web_interface,
-    reload_agents=config.reload_agents,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(
+        session_service.run_sweeper(config.session_sweep_interval_seconds)
+    )
+    flusher = asyncio.create_task(
+        tenant_store.run_flusher(config.tenant_flush_interval_seconds)
+    )
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        flusher.cancel()
+        # Write back playbooks of tenants still resident
+        tenant_store.flush()
+        if usage_store is not None:
+            usage_store.flush()
+
+
+def setup_observer(observer, server: AdkWebServer):
+    handler = AgentChangeEventHandler(
+        agent_loader=agent_loader,
+        runners_to_clean=server.runners_to_clean,
+        current_app_name_ref=server.current_app_name_ref,
+    )
+    observer.schedule(handler, config.agent_dir, recursive=True)
+    observer.start()
+
+
+def tear_down_observer(observer, _: AdkWebServer):
+    observer.stop()
+    observer.join()
+
+
+extra_fast_api_args = {}
+if config.reload_agents:
+    extra_fast_api_args.update(
+        setup_observer=setup_observer,
+        tear_down_observer=tear_down_observer,
+    )
+if config.trace_file:
+    extra_fast_api_args.update(
+        register_processors=lambda provider: add_file_exporter(
+            provider, config.trace_file
+        ),
+    )
+if config.serve_web_interface:
+    extra_fast_api_args.update(
+        web_assets_dir=Path(google.adk.cli.__file__).parent / "browser",
+    )
+
+app: FastAPI = adk_web_server.get_fast_api_app(
+    lifespan=lifespan, **extra_fast_api_args
 )
 
 # Add custom metadata for better frontend display
@@ -40,6 +138,120 @@ An intelligent agent system that learns and improves through iterative cycles:
 """
 app.version = "0.1.0"
 
+@app.get("/sessions/memory")
+async def sessions_memory():
+    """Report approximate memory used by every resident session."""
+    report = session_service.memory_report()
+    return {
+        "sessions": len(report),
+        "total_bytes": sum(item["bytes"] for item in report),
+        "evicted": session_service.evicted,
+        "items": report,
+    }
+
+
+@app.get("/cascade/stats")
+async def cascade_stats():
+    """Report escalation rate and latency/cost savings per cascaded stage."""
+    return cascade_report()
+
+
+@app.get("/prompts/cache")
+async def prompts_cache():
+    """Report prefix cache handles and the cacheable prefix ratio."""
+    return prompt_cache.stats()
+
+
+@app.get("/profiles/slowest")
+async def profiles_slowest():
+    """List the folded-stack profiles kept for the slowest cycles, slowest first."""
+    if profiler is None:
+        raise HTTPException(
+            status_code=404, detail="Set Config.profile_slowest_cycles to enable the profiler"
+        )
+    return [
+        {"duration_s": round(duration, 6), "invocation_id": invocation_id, "path": path}
+        for duration, invocation_id, path in profiler.slowest()
+    ]
+
+
+def _analytics_store():
+    if usage_store is None:
+        raise HTTPException(status_code=404, detail="Set Config.analytics_dir to enable analytics")
+    return usage_store
+
+
+def _playbook_bullet_ids(tenant: str) -> list:
+    playbook, _ = load_playbook(tenant)
+    return list(playbook.get("bullets", {}))
+
+
+@app.get("/analytics/stats")
+async def analytics_stats():
+    """Report the size of the bullet usage store."""
+    return _analytics_store().stats()
+
+
+@app.get("/analytics/unused")
+async def analytics_unused(
+    since_days: Optional[float] = None, tenant: str = config.default_tenant
+):
+    """List bullets of a tenant's playbook never cited, or not cited in ``since_days``."""
+    store = _analytics_store()
+    since = time.time() - since_days * 86400 if since_days is not None else None
+    return store.unused(tenant, _playbook_bullet_ids(tenant), since=since)
+
+
+@app.get("/analytics/neighbors/{bullet_id}")
+async def analytics_neighbors(
+    bullet_id: str, n: int = 5, tenant: str = config.default_tenant
+):
+    """List the bullets of a tenant most often cited together with ``bullet_id``."""
+    store = _analytics_store()
+    return [
+        {"bullet_id": other, "co_citations": count}
+        for other, count in store.neighbors(tenant, bullet_id, n)
+    ]
+
+
+@app.get("/analytics/drift")
+async def analytics_drift(
+    window_days: int = 7, n: int = 10, tenant: str = config.default_tenant
+):
+    """List a tenant's bullets whose helpful share changed most between recent windows."""
+    return _analytics_store().tag_drift(tenant, window_days=window_days, n=n)
+
+
+@app.get("/tenants/stats")
+async def tenants_stats():
+    """Report tenant playbook hit rate, load latency and resident memory."""
+    return tenant_store.stats()
+
+
+@app.post("/batch")
+async def batch(request: BatchRequest):
+    """Run many queries and stream one NDJSON result line per finished item.
+
+    Items run with bounded concurrency on a small pool of reused sessions.
+    Answers of cycles in flight use the playbook as of their start, so send
+    ``concurrency=1`` when every item must learn from the previous one.
+    """
+    runner = await adk_web_server.get_runner_async("ace_agent")
+    concurrency = min(
+        request.concurrency or config.batch_max_concurrency,
+        config.batch_max_concurrency,
+    )
+    batch_runner = BatchRunner(runner, session_service, concurrency)
+
+    async def lines():
+        async for result in batch_runner.run(
+            request.items, request.user_id, request.tenant_id
+        ):
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 # Add a custom welcome endpoint
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
 async def root():
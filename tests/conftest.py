@@ -0,0 +1,132 @@
+"""Shared fixtures: a stand-in model so the agents run without API access."""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai.types import (
+    Content,
+    GenerateContentResponseUsageMetadata,
+    Part,
+    UserContent,
+)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.ace_agent import prompts, tenants  # noqa: E402
+
+# Default structured output per agent role (agent name up to the first "_")
+ANSWERS: Dict[str, dict] = {
+    "Generator": {"reasoning": ["2 + 2 = 4"], "bullet_ids": [], "final_answer": "4"},
+    "Reflector": {
+        "reasoning": "ok",
+        "error_identification": "",
+        "root_cause_analysis": "",
+        "correct_approach": "",
+        "key_insight": "check arithmetic",
+        "bullet_tags": [],
+    },
+    "Curator": {"reasoning": "no changes", "operations": []},
+}
+
+
+class StandInLlm(BaseLlm):
+    """Answers requests in turn from ``answers``, after the matching ``delays``.
+
+    An exception in ``answers`` is raised instead of answering. Every request is kept in ``requests``; with ``tokens`` set, responses
+    report that many total tokens.
+    """
+
+    model: str = "stand-in"
+    answers: List[object]
+    delays: List[float] = [0.0]
+    tokens: int = 0
+    requests: List[LlmRequest] = []
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        call = len(self.requests)
+        self.requests.append(llm_request)
+        await asyncio.sleep(self.delays[call % len(self.delays)])
+        answer = self.answers[call % len(self.answers)]
+        if isinstance(answer, Exception):
+            raise answer
+        text = answer if isinstance(answer, str) else json.dumps(answer)
+        usage = (
+            GenerateContentResponseUsageMetadata(
+                prompt_token_count=self.tokens - 1,
+                candidates_token_count=1,
+                total_token_count=self.tokens,
+            )
+            if self.tokens
+            else None
+        )
+        yield LlmResponse(
+            content=Content(role="model", parts=[Part(text=text)]), usage_metadata=usage
+        )
+
+
+def instruction_of(llm_request: LlmRequest) -> str:
+    return llm_request.config.system_instruction or ""
+
+
+@pytest.fixture(autouse=True)
+def fresh_stores(monkeypatch):
+    """Give every test its own in-memory tenant store and prompt cache."""
+    monkeypatch.setattr(tenants, "tenant_store", tenants.TenantPlaybookStore(None, 0))
+    monkeypatch.setattr(prompts, "prompt_cache", prompts.PromptCache())
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Return ``patch(agent, **answers)`` to put stand-in models under ``agent``.
+
+    ``answers`` maps an agent role to its answers, defaulting to ANSWERS.
+    Returns the stand-in of every role; models are restored after the test.
+    """
+
+    def patch(agent, delays: Optional[List[float]] = None, tokens: int = 0, **answers):
+        models: Dict[str, StandInLlm] = {}
+
+        def walk(node):
+            if isinstance(node, LlmAgent):
+                role = node.name.split("_")[0]
+                if role not in models:
+                    models[role] = StandInLlm(
+                        answers=answers.get(role, [ANSWERS[role]]),
+                        delays=delays or [0.0],
+                        tokens=tokens,
+                    )
+                monkeypatch.setattr(node, "model", models[role])
+            for sub_agent in node.sub_agents:
+                walk(sub_agent)
+
+        walk(agent)
+        return models
+
+    return patch
+
+
+@pytest.fixture
+def run_query():
+    """Return ``await run(runner, session_id, query, user_id="u", state_delta=None)``.
+
+    The coroutine runs one query to completion and returns its events.
+    """
+
+    async def run(runner, session_id: str, query: str, user_id: str = "u", state_delta=None):
+        return [
+            event
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=UserContent(parts=[Part(text=query)]),
+                state_delta=state_delta,
+            )
+        ]
+
+    return run
@@ -0,0 +1,97 @@
+import os
+
+from agents.ace_agent.analytics import DAY, UsageStore
+
+
+def _store(path, **kwargs) -> UsageStore:
+    return UsageStore(str(path), **kwargs)
+
+
+def test_co_citations_are_tracked_per_tenant(tmp_path):
+    store = _store(tmp_path)
+    store.record_cycle("acme", ["a", "b"], [])
+    store.record_cycle("acme", ["a", "b", "c"], [])
+    store.record_cycle("acme", ["c", "d"], [])
+    store.record_cycle("other", ["a", "d"], [])
+
+    assert store.neighbors("acme", "a") == [("b", 2), ("c", 1)]
+    assert store.neighbors("other", "a") == [("d", 1)]
+    # Seeds are excluded; ties are broken by bullet id
+    assert store.prefetch("acme", ["a", "b"], n=5) == ["c"]
+    assert store.prefetch("acme", ["c"], n=5) == ["a", "b", "d"]
+    assert store.neighbor_table("other") == {"a": [("d", 1)], "d": [("a", 1)]}
+    assert store.stats()["co_cited_pairs"] == 5
+
+
+def test_unused_lists_never_cited_bullets_first(tmp_path):
+    store = _store(tmp_path)
+    store.record_cycle("acme", ["old"], [], ts=10 * DAY)
+    store.record_cycle("acme", ["recent"], [], ts=40 * DAY)
+
+    unused = store.unused("acme", ["old", "recent", "never"], since=30 * DAY)
+
+    assert [item["bullet_id"] for item in unused] == ["never", "old"]
+    assert unused[1] == {"bullet_id": "old", "last_used": 10 * DAY, "citations": 1}
+
+
+def test_tag_drift_compares_the_last_two_windows(tmp_path):
+    store = _store(tmp_path)
+    now = 100 * DAY
+    for day in range(8, 14):
+        tags = [("a", "helpful"), ("b", "helpful")]
+        store.record_cycle("acme", ["a", "b"], tags, ts=now - day * DAY)
+    for day in range(0, 6):
+        tags = [("a", "harmful"), ("b", "helpful")]
+        store.record_cycle("acme", ["a", "b"], tags, ts=now - day * DAY)
+
+    drift = store.tag_drift("acme", window_days=7, now=now)
+
+    assert drift[0]["bullet_id"] == "a"
+    assert drift[0]["helpful_share_change"] == -1.0
+    assert drift[0]["recent"] == {"helpful": 0, "harmful": 6, "neutral": 0}
+    assert drift[1]["bullet_id"] == "b" and drift[1]["helpful_share_change"] == 0.0
+    assert store.tag_drift("other", now=now) == []
+
+
+def _record(store: UsageStore) -> None:
+    for i in range(5):
+        store.record_cycle(
+            "acme", ["a", f"b{i % 2}"], [("a", "helpful"), (f"b{i % 2}", "harmful")], ts=i * DAY
+        )
+
+
+def _state(store: UsageStore) -> tuple:
+    return (
+        store.stats(),
+        store.neighbor_table("acme"),
+        store.last_used("acme", "a"),
+        store.tag_drift("acme", window_days=2, now=5 * DAY),
+    )
+
+
+def test_reload_applies_rows_after_the_snapshot(tmp_path):
+    store = _store(tmp_path, snapshot_every=2)
+    _record(store)
+    assert os.path.exists(tmp_path / "index.json")
+
+    # Snapshot after cycle 4, row tail for cycle 5
+    reloaded = _store(tmp_path)
+
+    assert _state(reloaded) == _state(store)
+    assert reloaded.cycles == 5
+
+
+def test_torn_row_is_dropped_on_reload(tmp_path):
+    store = _store(tmp_path, snapshot_every=100)
+    _record(store)
+    expected = _state(store)
+    # A crash between column appends leaves a longer ts column and half a value
+    with open(tmp_path / "ts.f64", "ab") as fh:
+        fh.write(b"\x00" * 12)
+
+    reloaded = _store(tmp_path)
+
+    assert _state(reloaded) == expected
+    assert os.path.getsize(tmp_path / "ts.f64") == reloaded.rows * 8
+    reloaded.record_cycle("acme", ["a", "c"], [], ts=5 * DAY)
+    assert _store(tmp_path).neighbors("acme", "c") == [("a", 1)]
@@ -0,0 +1,103 @@
+import asyncio
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.ace_agent.agent import root_agent
+from agents.ace_agent.services.batch import BatchItem, BatchRunner
+from agents.ace_agent.tenants import load_playbook
+
+ADD_BULLET = {
+    "reasoning": "add",
+    "operations": [{"type": "ADD", "section": "general", "content": "Check arithmetic"}],
+}
+
+
+class FailingSessionService(InMemorySessionService):
+    """Fails the first ``failures`` session creations."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def create_session(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("session store unavailable")
+        return await super().create_session(**kwargs)
+
+
+def _run_batch(session_service, items, concurrency, tenant_id=None, take=None):
+    runner = Runner(app_name="ace_agent", agent=root_agent, session_service=session_service)
+    batch_runner = BatchRunner(runner, session_service, concurrency)
+
+    async def scenario():
+        results = []
+        stream = batch_runner.run(items, "batch", tenant_id)
+        async for result in stream:
+            results.append(result)
+            if len(results) == take:
+                break
+        await stream.aclose()
+        return results
+
+    return asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+
+
+def _session_count(session_service) -> int:
+    async def count():
+        listed = await session_service.list_sessions(app_name="ace_agent", user_id="batch")
+        return len(listed.sessions)
+
+    return asyncio.run(count())
+
+
+def test_batch_streams_every_item_on_pooled_sessions(stand_in):
+    stand_in(root_agent, delays=[0.01])
+    items = [BatchItem(query=f"What is {i}+{i}?") for i in range(5)]
+
+    results = _run_batch(InMemorySessionService(), items, concurrency=2)
+
+    assert sorted(result["index"] for result in results) == list(range(5))
+    assert all(result["final_answer"] == "4" and "error" not in result for result in results)
+    assert len({result["session_id"] for result in results}) <= 2
+    assert all(result["timing"]["latency_s"] > 0 for result in results)
+
+
+def test_pooled_sessions_are_deleted(stand_in):
+    stand_in(root_agent, delays=[0.01])
+    items = [BatchItem(query=f"q{i}") for i in range(6)]
+
+    session_service = InMemorySessionService()
+    assert len(_run_batch(session_service, items, concurrency=3)) == 6
+    assert _session_count(session_service) == 0
+
+    # Also when the consumer stops reading early
+    assert len(_run_batch(session_service, items, concurrency=3, take=1)) == 1
+    assert _session_count(session_service) == 0
+
+
+def test_concurrent_items_keep_every_playbook_update(stand_in):
+    stand_in(root_agent, delays=[0.01], Curator=[ADD_BULLET])
+    items = [BatchItem(query=f"q{i}") for i in range(8)]
+
+    results = _run_batch(InMemorySessionService(), items, concurrency=4, tenant_id="acme")
+
+    assert len(results) == 8
+    playbook, _ = load_playbook("acme")
+    assert len(playbook["bullets"]) == 8
+    assert len(playbook["sections"]["general"]) == 8
+    assert load_playbook("default")[0]["bullets"] == {}
+
+
+def test_session_creation_failure_is_reported(stand_in):
+    stand_in(root_agent)
+    items = [BatchItem(query=f"q{i}") for i in range(4)]
+
+    results = _run_batch(FailingSessionService(failures=2), items, concurrency=2)
+
+    assert sorted(result["index"] for result in results) == list(range(4))
+    failed = [result for result in results if "error" in result]
+    assert len(failed) == 2
+    assert all(result["error"].startswith("RuntimeError") for result in failed)
+    assert all(result["final_answer"] == "4" for result in results if "error" not in result)
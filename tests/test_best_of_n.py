@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.ace_agent.sub_agents.best_of_n import answers_match, best_of_n
+from agents.ace_agent.sub_agents.generator import check_generator_draft, generator_
+
+
+def _answer(final_answer: str) -> dict:
+    return {"reasoning": ["r"], "bullet_ids": [], "final_answer": final_answer}
+
+
+def _run_best_of_n(run_query, ground_truth=None):
+    agent = best_of_n(generator_.clone(update={"name": "Generator"}), 3)
+
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=agent, session_service=session_service)
+        session = await session_service.create_session(
+            app_name="ace_agent",
+            user_id="u",
+            state={"user_query": "What is 2+2?", "ground_truth": ground_truth},
+        )
+        events = await run_query(runner, session.id, "What is 2+2?")
+        return events[-1]
+
+    return agent, scenario
+
+
+def test_quorum_cancels_outstanding_sample(stand_in, run_query):
+    agent, scenario = _run_best_of_n(run_query)
+    models = stand_in(
+        agent,
+        delays=[0.0, 0.0, 5.0],
+        tokens=100,
+        Generator=[_answer("4"), _answer("4"), _answer("5")],
+    )
+
+    started = time.perf_counter()
+    winner = asyncio.run(scenario())
+
+    assert time.perf_counter() - started < 2.0
+    assert len(models["Generator"].requests) == 3
+    delta = winner.actions.state_delta
+    assert delta["generator_output"]["final_answer"] == "4"
+    assert delta["generator_samples"]["completed"] == 2
+    assert delta["generator_samples"]["cancelled"] == 1
+    # Tokens of the finished samples are reported on the winner event
+    assert winner.usage_metadata.total_token_count == 200
+
+
+def test_ground_truth_match_wins_immediately(stand_in, run_query):
+    agent, scenario = _run_best_of_n(run_query, ground_truth="4")
+    stand_in(
+        agent,
+        delays=[0.0, 0.05, 5.0],
+        Generator=[_answer("5"), _answer("4"), _answer("5")],
+    )
+
+    winner = asyncio.run(scenario())
+
+    delta = winner.actions.state_delta
+    assert delta["generator_output"]["final_answer"] == "4"
+    assert delta["generator_samples"]["answers"][0]["votes"] == 1
+    assert delta["generator_samples"]["cancelled"] == 1
+
+
+@pytest.mark.parametrize(
+    "answer, ground_truth, expected",
+    [
+        ("4", "4", True),
+        ("The answer is 4.", "4", True),
+        ("4.0", "4", True),
+        ("1,000", "1000", True),
+        ("14", "4", False),
+        ("40", "4", False),
+        ("Paris", "paris", True),
+        ("Paris, France", "paris", False),
+    ],
+)
+def test_answers_match(answer, ground_truth, expected):
+    assert answers_match(answer, ground_truth) is expected
+
+
+def test_numeric_near_misses_do_not_win(stand_in, run_query):
+    agent, scenario = _run_best_of_n(run_query, ground_truth="4")
+    stand_in(
+        agent,
+        delays=[0.0, 0.0, 0.05],
+        Generator=[_answer("14"), _answer("40"), _answer("4")],
+    )
+
+    winner = asyncio.run(scenario())
+
+    assert winner.actions.state_delta["generator_output"]["final_answer"] == "4"
+
+
+def test_draft_with_near_miss_answer_is_escalated():
+    draft = _answer("14")
+    assert check_generator_draft(draft, {"ground_truth": "4"}) == "ground_truth_mismatch"
+    assert check_generator_draft(_answer("4"), {"ground_truth": "4"}) is None
+
+
+def test_failure_of_every_sample_keeps_the_cause(stand_in, run_query):
+    agent, scenario = _run_best_of_n(run_query)
+    stand_in(agent, Generator=[PermissionError("quota exceeded")])
+
+    with pytest.raises(RuntimeError, match="PermissionError: quota exceeded") as raised:
+        asyncio.run(scenario())
+
+    assert isinstance(raised.value.__cause__, PermissionError)
+
+
+def test_failed_samples_are_counted(stand_in, run_query):
+    agent, scenario = _run_best_of_n(run_query)
+    stand_in(
+        agent,
+        Generator=[PermissionError("quota exceeded"), _answer("4"), _answer("4")],
+    )
+
+    samples = asyncio.run(scenario()).actions.state_delta["generator_samples"]
+
+    assert (samples["completed"], samples["failed"], samples["cancelled"]) == (2, 1, 0)
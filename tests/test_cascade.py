@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from conftest import StandInLlm
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.ace_agent.sub_agents import cascade as cascade_module
+from agents.ace_agent.sub_agents.cascade import cascade, cascade_report
+from agents.ace_agent.sub_agents.generator import check_generator_draft, generator_
+
+
+def _answer(final_answer: str, bullet_ids=()) -> dict:
+    return {"reasoning": ["r"], "bullet_ids": list(bullet_ids), "final_answer": final_answer}
+
+
+@pytest.fixture
+def generator_cascade(monkeypatch):
+    """Return ``build(draft_answers, strong_answers)``: a Generator cascade on stand-ins."""
+    monkeypatch.setattr(cascade_module, "cascade_stats", {})
+
+    def build(draft_answers, strong_answers):
+        agent = cascade(
+            generator_.clone(update={"name": "Generator"}), "draft-model", check_generator_draft
+        )
+        models = {
+            "draft": StandInLlm(answers=draft_answers, tokens=100),
+            "strong": StandInLlm(answers=strong_answers, tokens=400),
+        }
+        monkeypatch.setattr(agent.draft, "model", models["draft"])
+        monkeypatch.setattr(agent.strong, "model", models["strong"])
+        return agent, models
+
+    return build
+
+
+def _run(agent, run_query, ground_truths) -> list:
+    """Answer "What is 2+2?" once per ground truth; returns the final answers."""
+
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=agent, session_service=session_service)
+        answers = []
+        for ground_truth in ground_truths:
+            session = await session_service.create_session(
+                app_name="ace_agent",
+                user_id="u",
+                state={"user_query": "What is 2+2?", "ground_truth": ground_truth},
+            )
+            await run_query(runner, session.id, "What is 2+2?")
+            session = await session_service.get_session(
+                app_name="ace_agent", user_id="u", session_id=session.id
+            )
+            answers.append(session.state["generator_output"]["final_answer"])
+        return answers
+
+    return asyncio.run(scenario())
+
+
+def test_confident_draft_skips_the_strong_model(generator_cascade, run_query):
+    agent, models = generator_cascade([_answer("4")], [_answer("4")])
+
+    assert _run(agent, run_query, ["4"]) == ["4"]
+
+    assert len(models["strong"].requests) == 0
+    report = cascade_report()["Generator"]
+    assert (report["calls"], report["escalations"], report["draft_tokens"]) == (1, 0, 100)
+    # Nothing was escalated, so there is no strong-call baseline to compare
+    assert report["cost_saved_strong_tokens"] is None
+
+
+@pytest.mark.parametrize(
+    "draft, reason",
+    [
+        (_answer("5"), "ground_truth_mismatch"),
+        (_answer(""), "empty_answer"),
+        (_answer("4", ["math-00001"]), "unknown_bullet"),
+        # ADK validates the output schema and raises before the check runs
+        ({"final_answer": "4"}, "draft_error"),
+        (ValueError("malformed output"), "draft_error"),
+    ],
+)
+def test_doubtful_draft_is_escalated(generator_cascade, run_query, draft, reason):
+    agent, models = generator_cascade([draft], [_answer("4")])
+
+    assert _run(agent, run_query, ["4"]) == ["4"]
+
+    assert len(models["strong"].requests) == 1
+    report = cascade_report()["Generator"]
+    assert report["reasons"] == {reason: 1}
+    assert report["strong_tokens"] == 400
+
+
+def test_report_estimates_savings_against_the_strong_model(generator_cascade, run_query):
+    agent, _ = generator_cascade([_answer("4"), _answer("5")], [_answer("4")])
+
+    assert _run(agent, run_query, ["4", "4"]) == ["4", "4"]
+
+    report = cascade_report()["Generator"]
+    assert (report["calls"], report["escalations"], report["escalation_rate"]) == (2, 1, 0.5)
+    # 2 calls x 400 strong tokens, minus 200 draft tokens at 0.25, minus 400 spent
+    assert report["cost_saved_strong_tokens"] == 350.0
+    assert report["latency_saved_s"] is not None
@@ -0,0 +1,97 @@
+import asyncio
+
+from conftest import StandInLlm
+
+from agents.ace_agent import prompts
+from agents.ace_agent.schemas.playbook import Playbook
+
+
+def _large_playbook() -> Playbook:
+    playbook = Playbook()
+    for section, count in [("geometry", 60), ("math", 10), ("physics", 10), ("style", 10)]:
+        for i in range(count):
+            bullet = playbook.add_bullet(section, f"{section} hint {i} about angles and sums " * 2)
+            if i % 3 == 0:
+                playbook.update_bullet_tag(bullet.id, "helpful")
+    return playbook
+
+
+def test_digest_is_reused_until_its_section_changes():
+    digests = prompts.SectionDigests()
+    playbook = Playbook()
+    bullet = playbook.add_bullet("math", "Check arithmetic")
+    playbook.add_bullet("style", "Answer briefly")
+
+    first, words = digests.get(playbook, "math")
+    playbook.add_bullet("style", "Show the steps")
+    assert digests.get(playbook, "math") == (first, words)
+
+    playbook.update_bullet_tag(bullet.id, "helpful")
+    tagged, _ = digests.get(playbook, "math")
+
+    assert first.startswith("## math (1 bullets, helpful=0, harmful=0) e.g. [")
+    assert tagged.startswith("## math (1 bullets, helpful=1, harmful=0)")
+    assert {"math", "check", "arithmetic"} <= words
+    assert (digests.hits, digests.misses) == (1, 2)
+
+
+def test_over_budget_prefix_lists_one_digest_per_section():
+    playbook = _large_playbook()
+    state = {prompts.PLAYBOOK_KEY: playbook.to_dict()}
+
+    handle = prompts.PromptCache().prefix("Generator", "static", state, budget_chars=6000)
+
+    assert handle.collapsed and len(playbook.as_prompt()) > 6000
+    lines = [line for line in handle.text.splitlines() if line.startswith("## ")]
+    assert [line.split()[1] for line in lines] == ["geometry", "math", "physics", "style"]
+    assert "## geometry (60 bullets, helpful=20, harmful=0)" in handle.text
+
+
+def test_collapsed_prefix_partially_expands_relevant_section():
+    cache = prompts.PromptCache()
+    state = {prompts.PLAYBOOK_KEY: _large_playbook().to_dict()}
+    handle = cache.prefix("Generator", "static", state, budget_chars=6000)
+    assert handle.collapsed
+
+    expanded = cache.expand(handle, "a geometry question", budget_chars=6000)
+
+    # The geometry section doesn't fit whole; its best bullets are shown
+    # instead of unrelated sections that would fit
+    assert [e.splitlines()[0] for e in expanded] == ["## geometry"]
+    assert expanded[0].endswith("of 60 bullets shown)")
+    assert handle.digests_chars + sum(len(e) + 1 for e in expanded) <= 6000
+    assert cache.stats()["partial_sections"] == 1
+
+
+def test_unrelated_query_expands_the_sections_that_fit():
+    cache = prompts.PromptCache()
+    state = {prompts.PLAYBOOK_KEY: _large_playbook().to_dict()}
+    handle = cache.prefix("Generator", "static", state, budget_chars=6000)
+
+    expanded = cache.expand(handle, "what is the capital of France", budget_chars=6000)
+
+    headers = [e.splitlines()[0] for e in expanded]
+    assert "## geometry" not in headers and headers
+    assert not any(e.endswith("bullets shown)") for e in expanded)
+    assert cache.stats()["partial_sections"] == 0
+
+
+def test_llm_section_summary_survives_tagging(monkeypatch):
+    summarizer = StandInLlm(answers=["Arithmetic checks."])
+    monkeypatch.setattr(prompts.LLMRegistry, "new_llm", staticmethod(lambda model: summarizer))
+    digests = prompts.SectionDigests(model="stand-in")
+    playbook = Playbook()
+    bullet = playbook.add_bullet("math", "Check arithmetic")
+
+    async def scenario():
+        digests.get(playbook, "math")
+        await asyncio.sleep(0.01)
+        playbook.update_bullet_tag(bullet.id, "helpful")
+        digest, _ = digests.get(playbook, "math")
+        await asyncio.sleep(0.01)
+        return digest
+
+    digest = asyncio.run(scenario())
+
+    assert digest == "## math (1 bullets, helpful=1, harmful=0) Arithmetic checks."
+    assert len(summarizer.requests) == 1
@@ -0,0 +1,102 @@
+import random
+import time
+
+import pytest
+
+from agents.ace_agent.schemas.playbook import (
+    SCORE_EPOCH,
+    SCORE_HALF_LIFE_DAYS,
+    Playbook,
+)
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable wall clock, starting a year after the score epoch."""
+    now = [SCORE_EPOCH + 365 * DAY]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def _ranking(bullets) -> list:
+    return [bullet.id for bullet in bullets]
+
+
+def test_score_halves_every_half_life(clock):
+    playbook = Playbook()
+    bullet = playbook.add_bullet("math", "Check units")
+    playbook.update_bullet_tag(bullet.id, "helpful")
+
+    assert bullet.score() == pytest.approx(1.0)
+    assert bullet.score(clock[0] + SCORE_HALF_LIFE_DAYS * DAY) == pytest.approx(0.5)
+    assert bullet.score(clock[0] + 2 * SCORE_HALF_LIFE_DAYS * DAY) == pytest.approx(0.25)
+
+
+def test_recent_tags_outrank_older_ones(clock):
+    playbook = Playbook()
+    old = playbook.add_bullet("math", "Old favourite")
+    new = playbook.add_bullet("math", "New insight")
+    harmful = playbook.add_bullet("math", "Bad advice")
+    playbook.update_bullet_tag(old.id, "helpful", increment=3)
+    playbook.update_bullet_tag(harmful.id, "harmful")
+
+    clock[0] += 2 * SCORE_HALF_LIFE_DAYS * DAY
+    playbook.update_bullet_tag(new.id, "helpful")
+
+    # 3 helpful tags two half-lives ago weigh 0.75 now, less than one today
+    assert _ranking(playbook.top_bullets(2)) == [new.id, old.id]
+    assert _ranking(playbook.bottom_bullets(1)) == [harmful.id]
+    assert old.helpful == 3  # Raw counters are not decayed
+
+
+def test_index_stays_in_sync_with_crud(clock):
+    rng = random.Random(7)
+    playbook = Playbook()
+    ids = [playbook.add_bullet("general", f"bullet {i}").id for i in range(30)]
+    playbook.top_bullets(1)  # Build the index, then keep it updated
+    for _ in range(200):
+        clock[0] += rng.uniform(0, 5 * DAY)
+        bullet_id = rng.choice(ids)
+        action = rng.random()
+        if action < 0.1 and bullet_id in playbook.bullets:
+            playbook.remove_bullet(bullet_id)
+        elif action < 0.2 and bullet_id not in playbook.bullets:
+            playbook.add_bullet("general", "re-added", bullet_id=bullet_id)
+        else:
+            playbook.update_bullet_tag(bullet_id, rng.choice(["helpful", "harmful", "neutral"]))
+
+    expected = sorted(playbook.bullets.values(), key=lambda b: (b.score_key, b.id))
+    assert _ranking(playbook.bottom_bullets(len(expected))) == _ranking(expected)
+    assert _ranking(playbook.top_bullets(5)) == _ranking(reversed(expected[-5:]))
+
+
+def test_ranking_round_trips_through_to_dict(clock):
+    playbook = Playbook()
+    for i in range(10):
+        bullet = playbook.add_bullet("general", f"bullet {i}")
+        playbook.update_bullet_tag(bullet.id, "helpful", increment=i % 4)
+        clock[0] += DAY
+
+    payload = playbook.to_dict()
+    restored = Playbook.from_dict(payload)
+
+    # The index comes back from the stored ranking, not from a sort
+    assert restored._score_index is not None
+    assert _ranking(restored.top_bullets(10)) == _ranking(playbook.top_bullets(10))
+    assert restored.fingerprint() == playbook.fingerprint()
+
+
+def test_stale_ranking_is_ignored(clock):
+    playbook = Playbook()
+    for i in range(5):
+        bullet = playbook.add_bullet("general", f"bullet {i}")
+        playbook.update_bullet_tag(bullet.id, "helpful", increment=i)
+    payload = playbook.to_dict()
+    payload["ranking"] = list(reversed(payload["ranking"]))
+
+    restored = Playbook.from_dict(payload)
+
+    assert restored._score_index is None
+    assert _ranking(restored.top_bullets(5)) == _ranking(playbook.top_bullets(5))
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from conftest import instruction_of
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.ace_agent import analytics, prompts
+from agents.ace_agent.agent import root_agent
+from agents.ace_agent.analytics import UsageStore
+from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.sub_agents.generator import GENERATOR_INSTRUCTION
+from agents.ace_agent.tenants import load_playbook, save_playbook
+
+ADD_BULLET = {
+    "reasoning": "add",
+    "operations": [{"type": "ADD", "section": "arithmetic", "content": "Carry the one"}],
+}
+
+
+def _seed(tenant: str, playbook: Playbook) -> str:
+    version = playbook.fingerprint()
+    save_playbook(tenant, playbook.to_dict(), version)
+    return version
+
+
+def _run_queries(run_query, queries):
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=root_agent, session_service=session_service)
+        session = await session_service.create_session(app_name="ace_agent", user_id="u")
+        for query in queries:
+            await run_query(runner, session.id, query)
+
+    asyncio.run(scenario())
+
+
+def test_prefix_layout_is_static_then_playbook_then_query(stand_in, run_query):
+    playbook = Playbook()
+    playbook.add_bullet("arithmetic", "Add units first")
+    version = _seed("default", playbook)
+    models = stand_in(root_agent)
+
+    _run_queries(run_query, ["What is 2+2?", "What is 3+3?"])
+
+    first, second = (instruction_of(r) for r in models["Generator"].requests)
+    handle_text = GENERATOR_INSTRUCTION.strip() + "\n\n" + f"Current Playbook (version {version[:12]}):"
+    assert first.startswith(handle_text)
+    assert first.index("Add units first") < first.index("What is 2+2?")
+    # Same playbook version: byte-identical prefix, only the query differs
+    prefix = first[: first.index("Input:")]
+    assert second.startswith(prefix)
+    assert "What is 3+3?" in second[len(prefix):]
+    assert prompts.prompt_cache.stats()["hits"] >= 1
+
+
+def test_prefix_depends_on_playbook_version_only(monkeypatch):
+    playbook = Playbook()
+    bullet = playbook.add_bullet("arithmetic", "Add units first")
+    playbook.update_bullet_tag(bullet.id, "helpful")
+    state = {prompts.PLAYBOOK_KEY: playbook.to_dict()}
+    first = prompts.PromptCache().prefix("Generator", "static", state).text
+
+    # Another worker, or the same one after a restart, 90 days later
+    later = time.time() + 90 * 86400
+    monkeypatch.setattr(time, "time", lambda: later)
+    second = prompts.PromptCache().prefix("Generator", "static", state).text
+
+    assert first == second
+
+
+def test_playbook_change_invalidates_prefix(stand_in, run_query):
+    version = _seed("default", Playbook())
+    models = stand_in(root_agent, Curator=[ADD_BULLET])
+
+    _run_queries(run_query, ["What is 2+2?", "What is 9+3?"])
+
+    first, second = (instruction_of(r) for r in models["Generator"].requests)
+    assert f"version {version[:12]}" in first and "Carry the one" not in first
+    assert f"version {version[:12]}" not in second and "Carry the one" in second
+    _, final_version = load_playbook("default")
+    assert final_version != version
+    stats = prompts.prompt_cache.stats()
+    assert stats["invalidations"] >= 1
+    assert not any(version[:12] in name for name in stats["handles"])
+
+
+def test_co_cited_bullets_follow_expanded_sections(stand_in, run_query, tmp_path, monkeypatch):
+    playbook = Playbook()
+    for i in range(60):
+        playbook.add_bullet("geometry", f"Geometry hint {i} on angles")
+    for i in range(150):
+        playbook.add_bullet("physics", f"Physics hint {i} about forces and motion")
+    geometry = playbook.sections["geometry"][0]
+    physics = playbook.sections["physics"][5]
+    _seed("default", playbook)
+    store = UsageStore(str(tmp_path))
+    for _ in range(3):
+        store.record_cycle("default", [geometry, physics], [])
+    monkeypatch.setattr(analytics, "usage_store", store)
+    models = stand_in(root_agent)
+
+    _run_queries(run_query, ["a geometry question"])
+
+    instruction = instruction_of(models["Generator"].requests[0])
+    related = instruction[instruction.index(prompts.RELATED_HEADER):]
+    assert related.splitlines()[1] == playbook.render_bullet(physics)
+    assert prompts.prompt_cache.stats()["related_bullets"] == 1
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+from google.adk.cli.utils.agent_loader import AgentLoader
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.ace_agent import analytics, replay, tenants, tracing
+from agents.ace_agent.agent import root_agent
+from agents.ace_agent.analytics import UsageStore
+from agents.ace_agent.prompts import RELATED_HEADER
+from agents.ace_agent.schemas.playbook import Playbook
+from config import Config
+
+
+def _records(path) -> list:
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+
+ADD_BULLET = {
+    "reasoning": "add",
+    "operations": [{"type": "ADD", "section": "arithmetic", "content": "Carry the one"}],
+}
+NO_CHANGES = {"reasoning": "no changes", "operations": []}
+
+
+def test_replay_reproduces_recorded_cycles(stand_in, run_query, tmp_path, monkeypatch):
+    path = str(tmp_path / "trace.jsonl")
+    recorder = replay.TraceRecorder(path)
+    monkeypatch.setattr(replay, "recorder", recorder)
+    models = stand_in(root_agent, Curator=[ADD_BULLET, NO_CHANGES, ADD_BULLET])
+
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=root_agent, session_service=session_service)
+        session = await session_service.create_session(app_name="ace_agent", user_id="u")
+        for query in ["What is 2+2?", "What is 9+3?", "What is 7+5?"]:
+            await run_query(runner, session.id, query)
+
+    asyncio.run(scenario())
+    recorded = _records(path)
+    live_version = tenants.load_playbook("default")[1]
+    calls = {role: len(model.requests) for role, model in models.items()}
+
+    report = asyncio.run(replay.run_replay(path))
+
+    assert report["cycles"] == 3
+    assert report["request_mismatches"] == 0
+    assert report["playbook_equal"] and report["playbook_fingerprint"] == live_version
+    # Answers came from the trace; the live recorder and tenant store are untouched
+    assert {role: len(model.requests) for role, model in models.items()} == calls
+    assert replay.recorder is recorder and _records(path) == recorded
+    assert tenants.load_playbook("default")[1] == live_version
+
+
+def test_loaded_agent_shares_recorder_and_profiler(stand_in, run_query, tmp_path, monkeypatch):
+    loaded = AgentLoader(Config().agent_dir).load_agent("ace_agent")
+    assert loaded is root_agent
+
+    recorder = replay.TraceRecorder(str(tmp_path / "trace.jsonl"))
+    profiler = tracing.CycleProfiler(keep=1, out_dir=str(tmp_path / "profiles"))
+    monkeypatch.setattr(replay, "recorder", recorder)
+    monkeypatch.setattr(tracing, "profiler", profiler)
+    stand_in(loaded)
+
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=loaded, session_service=session_service)
+        session = await session_service.create_session(app_name="ace_agent", user_id="u")
+        await run_query(runner, session.id, "What is 2+2?")
+
+    asyncio.run(scenario())
+
+    kinds = [record["type"] for record in _records(tmp_path / "trace.jsonl")]
+    assert kinds[0] == "cycle_start" and kinds[-1] == "cycle_end"
+    assert kinds.count("llm") == 3
+    # Cycle and model callbacks reached the same recorder, which cleaned up
+    assert recorder._model_started == {} and recorder._cycle_started == {}
+    assert len(profiler.slowest()) == 1 and profiler._active == {}
+
+
+def test_replay_reproduces_co_cited_bullets(stand_in, run_query, tmp_path, monkeypatch):
+    playbook = Playbook()
+    for i in range(20):
+        playbook.add_bullet("geometry", f"Geometry hint {i}")
+    for i in range(200):
+        playbook.add_bullet("physics", f"Physics hint {i} about forces and motion")
+    geometry, physics = playbook.sections["geometry"][0], playbook.sections["physics"][7]
+    tenants.save_playbook("default", playbook.to_dict(), playbook.fingerprint())
+    store = UsageStore(str(tmp_path / "usage"))
+    store.record_cycle("default", [geometry, physics], [])
+    monkeypatch.setattr(analytics, "usage_store", store)
+    monkeypatch.setattr(replay, "recorder", replay.TraceRecorder(str(tmp_path / "trace.jsonl")))
+    models = stand_in(root_agent)
+
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=root_agent, session_service=session_service)
+        session = await session_service.create_session(app_name="ace_agent", user_id="u")
+        await run_query(runner, session.id, "A geometry question")
+
+    asyncio.run(scenario())
+    instruction = models["Generator"].requests[0].config.system_instruction
+    assert RELATED_HEADER + "\n" + playbook.render_bullet(physics) in instruction
+
+    cycles = store.cycles
+    report = asyncio.run(replay.run_replay(str(tmp_path / "trace.jsonl")))
+
+    assert report["request_mismatches"] == 0
+    # The replayed cycle read the recorded co-citations and wrote nothing
+    assert analytics.usage_store is store and store.cycles == cycles
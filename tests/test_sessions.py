@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+
+from agents.ace_agent.agent import cycle_summary, root_agent
+from agents.ace_agent.prompts import PLAYBOOK_KEY
+from agents.ace_agent.services import ManagedSessionService, scratch_key, sessions
+from agents.ace_agent.services.sessions import SCRATCH_KEYS
+
+
+def _service(**kwargs) -> ManagedSessionService:
+    return ManagedSessionService(cycle_end_author=cycle_summary.name, **kwargs)
+
+
+def _stored(service: ManagedSessionService, session_id: str):
+    return service.sessions["ace_agent"]["u"][session_id]
+
+
+def test_cycle_end_drops_scratch_state_and_old_events(stand_in, run_query):
+    stand_in(root_agent)
+    service = _service(max_events=4)
+
+    async def scenario():
+        runner = Runner(app_name="ace_agent", agent=root_agent, session_service=service)
+        session = await service.create_session(app_name="ace_agent", user_id="u")
+        for query in ["What is 2+2?", "What is 3+3?"]:
+            await run_query(runner, session.id, query)
+        return session.id
+
+    stored = _stored(service, asyncio.run(scenario()))
+
+    assert not SCRATCH_KEYS & set(stored.state)
+    assert stored.state["ground_truth"] is None
+    assert len(stored.events) == 4
+    # Retained events no longer carry the scratch values either
+    for event in stored.events:
+        assert not SCRATCH_KEYS & set(event.actions.state_delta)
+
+
+def test_registered_scratch_keys_are_compacted(monkeypatch):
+    monkeypatch.setattr(sessions, "SCRATCH_KEYS", set(SCRATCH_KEYS))
+    key = scratch_key("test_stage_output")
+    service = _service()
+
+    async def scenario():
+        session = await service.create_session(app_name="ace_agent", user_id="u")
+        delta = {key: "draft", PLAYBOOK_KEY: {}, "kept": 1}
+        await service.append_event(
+            session, Event(author="Stage", actions=EventActions(state_delta=delta))
+        )
+        await service.append_event(session, Event(author=cycle_summary.name))
+        return session.id
+
+    stored = _stored(service, asyncio.run(scenario()))
+
+    assert stored.state == {"kept": 1}
+    assert stored.events[0].actions.state_delta == {"kept": 1}
+
+
+def test_least_recently_used_sessions_are_evicted():
+    service = _service(max_sessions=2)
+
+    async def scenario():
+        ids = [
+            (await service.create_session(app_name="ace_agent", user_id="u")).id
+            for _ in range(2)
+        ]
+        # Touch the first so the second is the least recently used
+        await service.get_session(app_name="ace_agent", user_id="u", session_id=ids[0])
+        await service.create_session(app_name="ace_agent", user_id="u")
+        return ids
+
+    first, second = asyncio.run(scenario())
+
+    assert first in service.sessions["ace_agent"]["u"]
+    assert second not in service.sessions["ace_agent"]["u"]
+    assert service.evicted == 1
+
+
+def test_idle_sessions_expire(monkeypatch):
+    service = _service(idle_ttl_seconds=60)
+
+    async def scenario():
+        return (await service.create_session(app_name="ace_agent", user_id="u")).id
+
+    session_id = asyncio.run(scenario())
+    assert service.evict_expired() == 0
+
+    later = time.monotonic() + 61
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+
+    assert service.evict_expired() == 1
+    assert session_id not in service.sessions["ace_agent"]["u"]
+    assert service.memory_report() == []
+
+
+def test_memory_report_lists_largest_sessions_first():
+    service = _service()
+
+    async def scenario():
+        small = await service.create_session(app_name="ace_agent", user_id="u")
+        large = await service.create_session(
+            app_name="ace_agent", user_id="u", state={"notes": "x" * 1000}
+        )
+        return small.id, large.id
+
+    small, large = asyncio.run(scenario())
+
+    report = service.memory_report()
+    assert [item["session_id"] for item in report] == [large, small]
+    assert report[0]["bytes"] > 1000 and report[0]["state_keys"] == 1
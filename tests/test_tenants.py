@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.ace_agent import tenants
+from agents.ace_agent.agent import root_agent
+from agents.ace_agent.schemas.playbook import Playbook
+from agents.ace_agent.tenants import TENANT_KEY, TenantPlaybookStore
+
+
+def _playbook(content: str, bullets: int = 20) -> Playbook:
+    playbook = Playbook()
+    for i in range(bullets):
+        playbook.add_bullet("general", f"{content} {i}")
+    return playbook
+
+
+def _put(store: TenantPlaybookStore, tenant: str, playbook: Playbook) -> str:
+    version = playbook.fingerprint()
+    store.put(tenant, playbook.to_dict(), version)
+    return version
+
+
+def test_over_quota_tenants_are_written_back_and_reloaded(tmp_path):
+    size = TenantPlaybookStore._size(_playbook("a").to_dict())
+    store = TenantPlaybookStore(str(tmp_path), quota_bytes=int(size * 1.5))
+
+    version_a = _put(store, "a", _playbook("a"))
+    _put(store, "b/c", _playbook("b"))
+
+    # "a" was least recently used: written to disk and unloaded
+    stats = store.stats()
+    assert stats["resident_tenants"] == 1
+    assert stats["evictions"] == 1
+    assert stats["resident_bytes"] <= store.quota_bytes
+    assert os.path.exists(tmp_path / "a.json")
+
+    data, version = store.get("a")
+    assert version == version_a
+    assert Playbook.from_dict(data).fingerprint() == version_a
+    store.get("a")
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+    # Loading "a" pushed "b/c" out; its file name is escaped
+    assert os.path.exists(tmp_path / "b%2Fc.json")
+
+
+def test_flush_writes_changed_tenants_only(tmp_path):
+    store = TenantPlaybookStore(str(tmp_path), quota_bytes=1 << 20)
+    _put(store, "a", _playbook("a"))
+    store.get("cold")
+
+    assert store.flush() == 1
+    assert store.flush() == 0
+    assert sorted(os.listdir(tmp_path)) == ["a.json"]
+
+
+def test_flusher_writes_back_resident_tenants(tmp_path):
+    store = TenantPlaybookStore(str(tmp_path), quota_bytes=1 << 20)
+    version = _put(store, "a", _playbook("a"))
+
+    async def scenario():
+        flusher = asyncio.create_task(store.run_flusher(0.01))
+        await asyncio.sleep(0.1)
+        flusher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flusher
+
+    asyncio.run(scenario())
+
+    # Still resident, but a restart would find the change on disk
+    assert store.stats()["resident_tenants"] == 1
+    _, reloaded = TenantPlaybookStore(str(tmp_path), quota_bytes=1 << 20).get("a")
+    assert reloaded == version
+
+
+def test_without_path_every_tenant_stays_resident():
+    store = TenantPlaybookStore(None, quota_bytes=1)
+    for tenant in "abc":
+        _put(store, tenant, _playbook(tenant))
+
+    assert store.stats()["resident_tenants"] == 3
+    assert store.stats()["evictions"] == 0
+    assert store.flush() == 0
+
+
+def test_sessions_only_change_their_tenants_playbook(stand_in, run_query):
+    stand_in(
+        root_agent,
+        Curator=[
+            {
+                "reasoning": "add",
+                "operations": [{"type": "ADD", "section": "general", "content": "Tenant tip"}],
+            }
+        ],
+    )
+
+    async def scenario():
+        session_service = InMemorySessionService()
+        runner = Runner(app_name="ace_agent", agent=root_agent, session_service=session_service)
+        session = await session_service.create_session(
+            app_name="ace_agent", user_id="u", state={TENANT_KEY: "acme"}
+        )
+        await run_query(runner, session.id, "What is 2+2?")
+
+    asyncio.run(scenario())
+
+    acme, _ = tenants.load_playbook("acme")
+    assert [b["content"] for b in acme["bullets"].values()] == ["Tenant tip"]
+    assert tenants.load_playbook("default")[0]["bullets"] == {}
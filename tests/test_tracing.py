@@ -0,0 +1,73 @@
+import json
+import os
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from agents.ace_agent.tracing import CycleProfiler, add_file_exporter
+
+
+def test_file_exporter_writes_otlp_json_lines(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    provider = TracerProvider()
+    add_file_exporter(provider, path)
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("invoke_agent Curator"):
+        with tracer.start_as_current_span(
+            "Playbook.apply_delta", attributes={"operations": 3, "dry_run": False}
+        ):
+            pass
+
+    with open(path, encoding="utf-8") as fh:
+        requests = [json.loads(line) for line in fh]
+    # One export request per finished span, innermost first
+    spans = [r["resourceSpans"][0]["scopeSpans"][0]["spans"][0] for r in requests]
+    child, parent = spans
+    assert (child["name"], parent["name"]) == ("Playbook.apply_delta", "invoke_agent Curator")
+    assert child["parentSpanId"] == parent["spanId"] and "parentSpanId" not in parent
+    assert child["traceId"] == parent["traceId"] and len(child["traceId"]) == 32
+    assert child["attributes"] == [
+        {"key": "operations", "value": {"intValue": "3"}},
+        {"key": "dry_run", "value": {"boolValue": False}},
+    ]
+    assert child["kind"] == 1  # SPAN_KIND_INTERNAL
+    assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+
+
+def _cycle(profiler: CycleProfiler, invocation_id: str, seconds: float):
+    profiler.start(invocation_id)
+    time.sleep(seconds)
+    return profiler.stop(invocation_id)
+
+
+def test_profiler_keeps_the_slowest_cycles(tmp_path):
+    profiler = CycleProfiler(keep=2, out_dir=str(tmp_path), interval_ms=1.0)
+
+    fast = _cycle(profiler, "fast", 0.02)
+    _cycle(profiler, "slow", 0.12)
+    _cycle(profiler, "medium", 0.06)
+    assert _cycle(profiler, "fastest", 0.0) is None
+
+    assert [entry[1] for entry in profiler.slowest()] == ["slow", "medium"]
+    assert not os.path.exists(fast)
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(path) for _, _, path in profiler.slowest()
+    )
+    # Folded stacks: "frame;frame;... count", sampled from this thread
+    with open(profiler.slowest()[0][2], encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("test_tracing.py:_cycle" in line for line in lines)
+
+
+def test_profiler_drops_cycles_that_never_stop(tmp_path):
+    profiler = CycleProfiler(keep=2, out_dir=str(tmp_path), timeout_seconds=0.05)
+
+    profiler.start("failed")
+    time.sleep(0.1)
+    profiler.start("next")
+
+    assert list(profiler._active) == ["next"]
+    assert profiler.stop("failed") is None
+    assert profiler.stop("next") is not None